@@ -1,46 +1,54 @@
 
 from argparse import ArgumentParser
 
-from src.tests import run
-from src.preMETIS import preMETIS
-
-class SITDTr(preMETIS):
-    def transform(self):
-        self.simplicial_reduction()
-        self.indistinguishable_reduction()
-        self.twin_reduction()
-        self.degree_2_elimination()
-        self.triangle_contraction()
-
-class SITP12(preMETIS):
-    def transform(self):
-        self.simplicial_reduction(degree_threshold=12)
-        self.indistinguishable_reduction()
-        self.twin_reduction()
-        self.path_compression()
-
-class SIDTr12(preMETIS):
-    def transform(self):
-        self.simplicial_reduction(degree_threshold=12)
-        self.indistinguishable_reduction()
-        self.degree_2_elimination()
-        self.triangle_contraction()
+from src.tests import run, load_network
+from src.benchmarks import run_ordering_benchmark, run_scaling_benchmark, SIZES
+from src.pipeline import Pipeline, variant
+from src.prefix_cache import PrefixCache
+from src.orderers import ORDERERS
+from src.timing import AdaptiveTiming
+
+class SITDTr(Pipeline):
+    steps = [
+        ('simplicial_reduction', {}),
+        ('indistinguishable_reduction', {}),
+        ('twin_reduction', {}),
+        ('degree_2_elimination', {}),
+        ('triangle_contraction', {}),
+    ]
+
+class SITP12(Pipeline):
+    steps = [
+        ('simplicial_reduction', {'degree_threshold': 12}),
+        ('indistinguishable_reduction', {}),
+        ('twin_reduction', {}),
+        ('path_compression', {}),
+    ]
+
+class SIDTr12(Pipeline):
+    steps = [
+        ('simplicial_reduction', {'degree_threshold': 12}),
+        ('indistinguishable_reduction', {}),
+        ('degree_2_elimination', {}),
+        ('triangle_contraction', {}),
+    ]
     
-class SITD6(preMETIS):
-    def transform(self):
-        self.simplicial_reduction(degree_threshold=6)
-        self.indistinguishable_reduction()
-        self.twin_reduction()
-        self.degree_2_elimination()
+class SITD6(Pipeline):
+    steps = [
+        ('simplicial_reduction', {'degree_threshold': 6}),
+        ('indistinguishable_reduction', {}),
+        ('twin_reduction', {}),
+        ('degree_2_elimination', {}),
+    ]
     
-class SD18(preMETIS):
-    def transform(self):
-        self.simplicial_reduction(degree_threshold=18)
-        self.degree_2_elimination()
+class SD18(Pipeline):
+    steps = [
+        ('simplicial_reduction', {'degree_threshold': 18}),
+        ('degree_2_elimination', {}),
+    ]
     
-class METIS(preMETIS):
-    def transform(self):
-        pass
+class METIS(Pipeline):
+    steps = []
 
 
 BASE_TESTS = [
@@ -65,14 +73,114 @@ def main():
 
     parser.add_argument('--tests', nargs='+', choices=list(TEST_NAME_MAP.keys()) + ['all'], default=['all'],
                     help='Specify which tests to run, or "all" for all tests')
+    parser.add_argument('--backend', choices=['networkx', 'csr'], default=None,
+                    help='Override the graph backend of the selected tests')
+    parser.add_argument('--fixpoint', action='store_true',
+                    help='Repeat each test pipeline on changed nodes until no reduction applies')
+    parser.add_argument('--operation-budget', type=int, default=None,
+                    help='Stop a fixpoint pipeline once this many operations were spent')
+    parser.add_argument('--fill-in', choices=['symbolic', 'cholmod', 'check'], default='symbolic',
+                    help='Count fill-in symbolically, from a CHOLMOD factorization, or check both agree')
+    parser.add_argument('--jobs', type=int, default=1,
+                    help='Run (graph, test) pairs in this many worker processes')
+    parser.add_argument('--serialize-metis', action='store_true',
+                    help='With --jobs, never run two METIS timing loops at once')
+    parser.add_argument('--pin', action='store_true',
+                    help='With --jobs, pin each worker process to its own core')
+    parser.add_argument('--resume', action='store_true',
+                    help='Skip tests whose results for the same graph and configuration are already stored')
+    parser.add_argument('--orderer', nargs='+', choices=list(ORDERERS), default=['metis'],
+                    help='Order the reduced graphs with these backends')
+    parser.add_argument('--compare-weights', action='store_true',
+                    help='Also run every test with unweighted METIS on the reduced graph')
+    parser.add_argument('--dissect', type=int, default=None, metavar='THRESHOLD',
+                    help='Reduce and dissect recursively until parts have at most THRESHOLD vertices')
+    parser.add_argument('--dissect-jobs', type=int, default=1,
+                    help='With --dissect, solve independent parts in this many worker processes')
+    parser.add_argument('--partitions', type=int, default=None, metavar='K',
+                    help='Reduce the parts of a K-way METIS partition independently, then the boundary between them')
+    parser.add_argument('--partition-jobs', type=int, default=1,
+                    help='With --partitions, reduce the parts in this many worker processes')
+    parser.add_argument('--adaptive-timing', type=float, default=None, metavar='REL_WIDTH',
+                    help='Repeat each ordering until the 95%% confidence interval of its mean runtime '
+                         'is within +-REL_WIDTH times the mean, instead of 10 times')
+    parser.add_argument('--min-reps', type=int, default=3,
+                    help='With --adaptive-timing, the least number of timed repetitions')
+    parser.add_argument('--max-reps', type=int, default=50,
+                    help='With --adaptive-timing, the most number of timed repetitions')
+    parser.add_argument('--instrument', choices=['time', 'memory'], default=None,
+                    help='Record wall and CPU time of every reduction under "Stages", '
+                         'and with "memory" its peak traced allocations (much slower)')
+    parser.add_argument('--prefix-cache-mb', type=int, default=0,
+                    help='Share reduction prefixes between tests, keeping at most this many MB of snapshots')
+    parser.add_argument('--benchmark', choices=['ordering', 'scaling'], default=None,
+                    help='Run a scaling benchmark instead of the tests: "ordering" on roadNet-TX, '
+                         '"scaling" on synthetic graph families, offline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                    help='With --benchmark scaling, the graph sizes of every family')
+    parser.add_argument('--compare-to', type=str, default=None, metavar='COMMIT',
+                    help='With --benchmark scaling, print the results saved for COMMIT alongside')
     args = parser.parse_args()
+    if args.partitions is not None and args.dissect is not None:
+        parser.error('--partitions cannot be combined with --dissect, which reduces the whole graph itself')
 
     if 'all' in args.tests:
         tests_to_run = list(TEST_NAME_MAP.values())
     else:
         tests_to_run = [TEST_NAME_MAP[name] for name in args.tests]
 
-    run(ROAD_NETWORKS, tests_to_run)
+    if args.backend is not None:
+        tests_to_run = [variant(test, backend=args.backend) for test in tests_to_run]
+
+    if args.instrument:
+        tests_to_run = [variant(test, instrument_stages=args.instrument) for test in tests_to_run]
+
+    if args.fixpoint:
+        tests_to_run = [
+            variant(test, test.__name__ + 'Fix', fixpoint=True, operation_budget=args.operation_budget)
+            for test in tests_to_run
+        ]
+
+    tests_to_run = [
+        test if orderer == 'metis' else variant(test, test.__name__ + orderer.upper(), orderer=orderer)
+        for orderer in args.orderer
+        for test in tests_to_run
+    ]
+
+    if args.compare_weights:
+        tests_to_run += [
+            variant(test, test.__name__ + 'Unweighted', weighted_metis=False)
+            for test in tests_to_run
+        ]
+
+    if args.partitions is not None:
+        tests_to_run = [
+            variant(test, test.__name__ + f'P{args.partitions}', partitions=args.partitions, partition_jobs=args.partition_jobs)
+            for test in tests_to_run
+        ]
+
+    if args.dissect is not None:
+        tests_to_run = [
+            variant(test, test.__name__ + 'RD', dissection_threshold=args.dissect, dissection_jobs=args.dissect_jobs)
+            for test in tests_to_run
+        ]
+
+    if args.prefix_cache_mb > 0:
+        Pipeline.prefix_cache = PrefixCache(args.prefix_cache_mb * 2**20)
+        Pipeline.prefix_cache.plan(tests_to_run)
+
+    if args.benchmark == 'ordering':
+        run_ordering_benchmark(load_network(ROAD_NETWORKS['roadNet-TX'], as_networkx=True), tests_to_run)
+        return
+    if args.benchmark == 'scaling':
+        run_scaling_benchmark(tests_to_run, args.sizes, args.compare_to, args.backend or Pipeline.backend)
+        return
+
+    timing = None
+    if args.adaptive_timing is not None:
+        timing = AdaptiveTiming(args.adaptive_timing, args.min_reps, args.max_reps)
+
+    run(ROAD_NETWORKS, tests_to_run, args.fill_in, args.jobs, args.serialize_metis, args.pin, timing, args.resume)
 
 
 if __name__ == "__main__":
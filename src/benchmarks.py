@@ -0,0 +1,199 @@
+import networkx as nx
+import numpy as np
+import json
+import os
+import subprocess
+import time
+from scipy.spatial import Delaunay, cKDTree
+
+from .preMETIS import preMETIS
+from .csr_graph import CSRGraph
+from .pipeline import Pipeline, variant
+
+FRACTIONS = [1/16, 1/8, 1/4, 1/2, 1]
+SIZES = [1000, 4000, 16000, 64000]
+BENCHMARK_DIR = 'benchmarks'
+REDUCTIONS = [
+    'simplicial_reduction',
+    'indistinguishable_reduction',
+    'twin_reduction',
+    'path_compression',
+    'degree_2_elimination',
+    'triangle_contraction',
+]
+
+
+def ordering_scaling(graph: nx.Graph, test: preMETIS, fractions=FRACTIONS):
+    '''
+    Times get_ordering on growing BFS balls of the graph
+    Returns the (nodes, seconds) samples and the fitted log-log scaling exponent
+    '''
+    source = next(iter(graph.nodes()))
+    bfs_order = [source] + [v for _, v in nx.bfs_edges(graph, source)]
+
+    samples = []
+    for fraction in fractions:
+        subgraph = graph.subgraph(bfs_order[:int(fraction * len(bfs_order))])
+        test_graph = test(subgraph)
+        idx_mapping = list(test_graph.graph.nodes()) # identity in place of a METIS ordering
+
+        start = time.perf_counter()
+        test_graph.get_ordering(range(len(idx_mapping)), idx_mapping)
+        samples.append((subgraph.number_of_nodes(), time.perf_counter() - start))
+
+    sizes, runtimes = np.array(samples).T
+    return samples, _fit_exponent(sizes, runtimes)
+
+
+def run_ordering_benchmark(graph: nx.Graph, tests):
+    for test in tests:
+        print(f"get_ordering scaling for {test.__name__}:")
+        samples, exponent = ordering_scaling(graph, test)
+        for nodes, runtime in samples:
+            print(f"\t{int(nodes):>9} nodes: {runtime:.4f} s")
+        print(f"\tFitted exponent: {exponent:.2f}")
+
+
+def grid_2d(n, seed=0):
+    side = max(2, round(n ** (1 / 2)))
+    ids = np.arange(side * side).reshape(side, side)
+    u = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+    v = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+    return CSRGraph.from_edges(u, v, side * side)
+
+
+def grid_3d(n, seed=0):
+    side = max(2, round(n ** (1 / 3)))
+    ids = np.arange(side ** 3).reshape(side, side, side)
+    u = np.concatenate([ids[:-1].ravel(), ids[:, :-1].ravel(), ids[:, :, :-1].ravel()])
+    v = np.concatenate([ids[1:].ravel(), ids[:, 1:].ravel(), ids[:, :, 1:].ravel()])
+    return CSRGraph.from_edges(u, v, side ** 3)
+
+
+def road_model(n, seed=0, keep=0.6, subdivide=0.3):
+    '''
+    Planar road-like graph: a Delaunay triangulation of random intersections,
+    thinned to a `keep` fraction of its edges, with a `subdivide` fraction of the
+    remaining edges replaced by chains of 1-4 degree-2 vertices
+    '''
+    rng = np.random.default_rng(seed)
+    points = rng.random((max(4, n // 2), 2))
+    triangles = Delaunay(points).simplices
+    edges = np.unique(np.sort(np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [0, 2]]]), axis=1), axis=0)
+    edges = edges[rng.random(len(edges)) < keep]
+
+    chained = rng.random(len(edges)) < subdivide
+    lengths = rng.integers(1, 5, size=chained.sum())
+    first = len(points) + np.concatenate([[0], np.cumsum(lengths)[:-1]]) # first chain vertex of each chain
+    chain = np.repeat(np.arange(len(lengths)), lengths)
+    inner = len(points) + np.arange(lengths.sum())
+    last = first + lengths - 1
+    # every chain is u - first - ... - last - v
+    u = np.concatenate([edges[~chained, 0], edges[chained, 0], inner[:-1][chain[:-1] == chain[1:]], last])
+    v = np.concatenate([edges[~chained, 1], first, inner[1:][chain[:-1] == chain[1:]], edges[chained, 1]])
+    return CSRGraph.from_edges(u, v, len(points) + lengths.sum()).largest_component()
+
+
+def random_geometric(n, seed=0, mean_degree=8):
+    rng = np.random.default_rng(seed)
+    points = rng.random((n, 2))
+    radius = np.sqrt(mean_degree / (np.pi * n))
+    u, v = cKDTree(points).query_pairs(radius, output_type='ndarray').T
+    return CSRGraph.from_edges(u, v, n).largest_component()
+
+
+def power_law(n, seed=0, exponent=2.5, mean_degree=4):
+    '''
+    Chung-Lu graph with a power-law expected degree sequence
+    '''
+    rng = np.random.default_rng(seed)
+    weights = np.arange(1, n + 1) ** (-1 / (exponent - 1))
+    p = weights / weights.sum()
+    m = n * mean_degree // 2
+    return CSRGraph.from_edges(rng.choice(n, m, p=p), rng.choice(n, m, p=p), n).largest_component()
+
+
+FAMILIES = {
+    'grid2d' : grid_2d,
+    'grid3d' : grid_3d,
+    'road' : road_model,
+    'rgg' : random_geometric,
+    'powerlaw' : power_law,
+}
+
+
+def reduction_tests(backend=Pipeline.backend):
+    '''
+    One single-step pipeline per reduction
+    '''
+    return [variant(Pipeline, func, steps=[(func, {})], backend=backend) for func in REDUCTIONS]
+
+
+def scaling_suite(tests, families=FAMILIES, sizes=SIZES, seed=0):
+    '''
+    Times every test (construction and reductions) on every synthetic family at
+    the given sizes, and fits the log-log scaling exponent of each
+    Returns {'commit', 'sizes', 'results': {family: {test: {'samples', 'exponent'}}}}
+    '''
+    results = {}
+    for family in families:
+        results[family] = {test.__name__ : {'samples' : []} for test in tests}
+        for size in sizes:
+            graph = FAMILIES[family](size, seed)
+            as_networkx = graph.to_networkx()
+            for test in tests:
+                start = time.perf_counter()
+                test(graph if test.backend == 'csr' else as_networkx)
+                runtime = time.perf_counter() - start
+                results[family][test.__name__]['samples'].append((graph.n, graph.number_of_edges(), runtime))
+
+        for test_results in results[family].values():
+            nodes, _, runtimes = np.array(test_results['samples']).T
+            test_results['exponent'] = _fit_exponent(nodes, runtimes)
+
+    return {'commit' : _git_commit(), 'sizes' : list(sizes), 'results' : results}
+
+
+def run_scaling_benchmark(tests, sizes=SIZES, compare_to=None, backend=Pipeline.backend):
+    '''
+    Runs scaling_suite on tests and every single reduction, saves the report to
+    benchmarks/<commit>.json and prints it next to the report of compare_to
+    '''
+    tests = list(tests) + reduction_tests(backend)
+    report = scaling_suite(tests, sizes=sizes)
+
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    out_path = os.path.join(BENCHMARK_DIR, f"{report['commit']}.json")
+    with open(out_path, 'w') as f:
+        json.dump(report, f, indent=4)
+
+    baseline = None
+    if compare_to is not None:
+        with open(os.path.join(BENCHMARK_DIR, f"{compare_to}.json")) as f:
+            baseline = json.load(f)['results']
+
+    for family, family_results in report['results'].items():
+        print(f"{family}:")
+        for test, test_results in family_results.items():
+            line = f"\t{test:>28}: exponent {test_results['exponent']:.2f}, {test_results['samples'][-1][2]:.4f} s at n={test_results['samples'][-1][0]}"
+            old = (baseline or {}).get(family, {}).get(test)
+            if old is not None:
+                line += f" (was {old['exponent']:.2f}, {old['samples'][-1][2]:.4f} s)"
+            print(line)
+    print(f"Saved to {out_path}")
+
+
+def _fit_exponent(sizes, runtimes):
+    return float(np.polyfit(np.log(sizes), np.log(np.maximum(runtimes, 1e-9)), 1)[0])
+
+
+def _git_commit():
+    '''
+    Short hash of the checked out commit, suffixed with -dirty if the tree has changes
+    '''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+    return commit + ('-dirty' if dirty else '')
@@ -0,0 +1,40 @@
+from collections import defaultdict
+
+
+class BucketQueue:
+    '''
+    Nodes bucketed by an integer key (e.g. their current degree).
+    update/pop are O(1); pop_min scans upwards from the smallest
+    key seen since the last pop_min.
+    '''
+
+    def __init__(self):
+        self.buckets = defaultdict(set)
+        self.keys = {}
+        self.min_key = None
+
+    def bucket_size(self, key):
+        return len(self.buckets.get(key, ()))
+
+    def update(self, node, key):
+        old = self.keys.get(node)
+        if old == key:
+            return
+        if old is not None:
+            self.buckets[old].discard(node)
+        self.keys[node] = key
+        self.buckets[key].add(node)
+        if self.min_key is None or key < self.min_key:
+            self.min_key = key
+
+    def pop(self, key):
+        node = self.buckets[key].pop()
+        del self.keys[node]
+        return node
+
+    def pop_min(self):
+        if not self.keys:
+            raise KeyError('pop from an empty BucketQueue')
+        while not self.buckets.get(self.min_key):
+            self.min_key += 1
+        return self.pop(self.min_key)
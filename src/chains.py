@@ -0,0 +1,74 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, shortest_path
+
+
+def degree_2_chains(nodes, neighbors):
+    '''
+    Maximal chains of degree-2 nodes, found at once as the connected components
+    of the subgraph induced by the degree-2 nodes. neighbors[i] lists the two
+    neighbors of nodes[i].
+
+    Every chain is listed in path order, oriented as path_compression's walk
+    over the nodes in the given order would list it: from the side of the first
+    neighbor of the chain's first node to the other. The order along the chains
+    comes from one BFS, from a virtual node joined to one end of every chain
+    (cycles are cut open first), and a lexsort by (chain, distance).
+
+    Returns (members, sizes, ends): the node ids of every chain one after the
+    other, the length of every chain, and the non-degree-2 neighbors (u, v) next
+    to the first and last node of every chain, (-1, -1) if it is a cycle.
+    Chains of a single node are left out.
+    O(k log k) for k degree-2 nodes
+    '''
+    k = len(nodes)
+    if k < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+    sorter = np.argsort(nodes)
+    found = np.minimum(np.searchsorted(nodes, neighbors, sorter=sorter), k - 1)
+    inner = nodes[sorter[found]] == neighbors
+    pos = np.where(inner, sorter[found], -1) # position of every degree-2 neighbor in nodes
+
+    rows, slots = np.nonzero(inner)
+    cols = pos[rows, slots]
+    chain_graph = sp.csr_array((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(k, k))
+    count, chain = connected_components(chain_graph, directed=False)
+    first = np.unique(chain, return_index=True)[1] # first node of every chain in the given order
+    sizes = np.bincount(chain, minlength=count)
+
+    inner_degree = inner.sum(axis=1)
+    is_end = inner_degree < 2
+    end_chains, end_index = np.unique(chain[is_end], return_index=True)
+    cycle = np.ones(count, dtype=bool)
+    cycle[end_chains] = False
+
+    # cycles start after their first node's second neighbor, and end with it
+    start = np.empty(count, dtype=np.int64)
+    start[end_chains] = np.flatnonzero(is_end)[end_index]
+    start[cycle] = pos[first[cycle], 1]
+    cut = cycle[chain[rows]] & (
+        ((rows == first[chain[rows]]) & (cols == start[chain[rows]])) |
+        ((cols == first[chain[rows]]) & (rows == start[chain[rows]]))
+    )
+
+    source = k # virtual node
+    joined = np.flatnonzero(sizes > 1)
+    rows = np.concatenate([rows[~cut], np.full(len(joined), source)])
+    cols = np.concatenate([cols[~cut], start[joined]])
+    cut_graph = sp.csr_array((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(k + 1, k + 1))
+    distance = shortest_path(cut_graph, method='D', directed=False, unweighted=True, indices=source)[:k]
+
+    # the walk lists the chain from the side of its first node's first neighbor
+    lowest = first[chain]
+    toward = pos[lowest, 0]
+    forward = np.where(toward >= 0, distance[np.maximum(toward, 0)] < distance[lowest], distance[lowest] == 1)
+    forward |= cycle[chain]
+    order = np.lexsort((np.where(forward, distance, -distance), chain))
+
+    bounds = np.concatenate([[0], np.cumsum(sizes)])
+    outer = np.where(inner, -1, neighbors).max(axis=1) # the non-degree-2 neighbor of an end
+    ends = np.stack([outer[order[bounds[joined]]], outer[order[bounds[joined + 1] - 1]]], axis=1)
+    ends[cycle[joined]] = -1
+
+    members = order[np.repeat(sizes > 1, sizes)]
+    return nodes[members], sizes[joined], ends
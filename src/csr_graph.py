@@ -0,0 +1,386 @@
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+
+class CSRGraph:
+    '''
+    Array-backed undirected graph used as an alternative preMETIS backend.
+
+    The input adjacency is stored once as CSR arrays (`indptr`, `indices`) and
+    is never written to. Removed vertices are tombstoned in `alive`, and edges
+    created by the reductions live in a per-vertex overflow area (`extra`).
+    Vertices are integer ids: 0..n-1 are the input vertices (see `labels`),
+    ids >= n are created by `add_node`.
+
+    Only the subset of the networkx.Graph interface used by preMETIS is provided.
+    '''
+
+    def __init__(self, indptr, indices, labels=None):
+        self.n = len(indptr) - 1
+        self.indptr = indptr
+        self.indices = indices
+        self.labels = labels if labels is not None else np.arange(self.n)
+
+        self.size = self.n # number of allocated ids
+        self.alive = np.ones(self.n, dtype=bool)
+        self.deg = np.diff(indptr).astype(np.int32)
+        self.extra = {}
+
+        self._number_of_nodes = self.n
+        self._number_of_edges = len(indices) // 2
+
+    @classmethod
+    def from_networkx(cls, graph: nx.Graph):
+        nodes = list(graph.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+
+        degrees = np.fromiter((len(graph.adj[node]) for node in nodes), dtype=np.int64, count=len(nodes))
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = np.fromiter((index[u] for node in nodes for u in graph.adj[node]), dtype=np.int32, count=indptr[-1])
+        del index
+
+        rows = np.repeat(np.arange(len(nodes), dtype=np.int32), degrees)
+        indices = indices[np.lexsort((indices, rows))] # sorted rows for has_edge
+        return cls(indptr, indices, np.array(nodes))
+
+    @classmethod
+    def from_edges(cls, u, v, n, labels=None):
+        '''
+        Graph on vertices 0..n-1 from the endpoint arrays of its edges,
+        dropping self-loops and duplicate edges
+        O(m log m)
+        '''
+        u, v = np.asarray(u), np.asarray(v)
+        u, v = u[u != v], v[u != v]
+        A = sp.csr_array(
+            (np.ones(2 * len(u), dtype=np.int8), (np.concatenate([u, v]), np.concatenate([v, u]))),
+            shape=(n, n)
+        )
+        A.sort_indices()
+        return cls(A.indptr.astype(np.int64), A.indices.astype(np.int32), labels)
+
+    def largest_component(self):
+        '''
+        Largest connected component of the base graph, keeping the labels
+        O(n + m)
+        '''
+        A = sp.csr_array((np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr), shape=(self.n, self.n))
+        _, component = connected_components(A, directed=False)
+        largest = np.flatnonzero(component == np.bincount(component).argmax())
+        A = A[largest][:, largest]
+        A.sort_indices()
+        return CSRGraph(A.indptr.astype(np.int64), A.indices.astype(np.int32), np.asarray(self.labels)[largest])
+
+    def copy(self):
+        '''
+        Copy of the current graph sharing the read-only base arrays
+        O(n + edits)
+        '''
+        graph = CSRGraph.__new__(CSRGraph)
+        graph.__dict__.update(self.__dict__)
+        graph.alive = self.alive.copy()
+        graph.deg = self.deg.copy()
+        graph.extra = {node: set(nbrs) for node, nbrs in self.extra.items()}
+        return graph
+
+    def to_networkx(self):
+        '''
+        networkx.Graph of the base adjacency with vertices 0..n-1
+        '''
+        graph = nx.Graph()
+        graph.add_nodes_from(range(self.n))
+        rows = np.repeat(np.arange(self.n), np.diff(self.indptr))
+        upper = rows < self.indices
+        graph.add_edges_from(zip(rows[upper].tolist(), np.asarray(self.indices)[upper].tolist()))
+        return graph
+
+    def label_index(self, labels):
+        '''
+        Input vertex ids of the given labels
+        O(k log n)
+        '''
+        sorter = np.argsort(self.labels)
+        return sorter[np.searchsorted(self.labels, labels, sorter=sorter)]
+
+    def number_of_nodes(self):
+        return self._number_of_nodes
+
+    def number_of_edges(self):
+        return self._number_of_edges
+
+    def nodes(self):
+        return np.flatnonzero(self.alive[:self.size]).tolist()
+
+    def has_node(self, node):
+        return node < self.size and bool(self.alive[node])
+
+    def degree(self, node):
+        '''
+        Degree of a node, or (node, degree) pairs of a list of nodes
+        '''
+        if isinstance(node, list):
+            return zip(node, self.deg[node].tolist())
+        return int(self.deg[node])
+
+    def neighbors(self, node):
+        '''
+        O(deg(v)) for the base row plus the overflow edges
+        '''
+        if node < self.n:
+            row = self.indices[self.indptr[node]:self.indptr[node + 1]]
+            nbrs = row[self.alive[row]].tolist()
+        else:
+            nbrs = []
+        extra = self.extra.get(node)
+        if extra:
+            nbrs.extend(extra)
+        return nbrs
+
+    def has_edge(self, u, v):
+        extra = self.extra.get(u)
+        if extra and v in extra:
+            return True
+        if u >= self.n or v >= self.n or not (self.alive[u] and self.alive[v]):
+            return False
+        row = self.indices[self.indptr[u]:self.indptr[u + 1]]
+        i = np.searchsorted(row, v)
+        return i < len(row) and row[i] == v
+
+    def edges(self):
+        for u in self.nodes():
+            for v in self.neighbors(u):
+                if u < v:
+                    yield u, v
+
+    def add_node(self, node=None):
+        '''
+        Allocates a new vertex id (or the given one) and returns it
+        '''
+        if node is None:
+            node = self.size
+        if node >= len(self.alive):
+            capacity = max(node + 1, 2 * len(self.alive))
+            self.alive = np.concatenate([self.alive, np.zeros(capacity - len(self.alive), dtype=bool)])
+            self.deg = np.concatenate([self.deg, np.zeros(capacity - len(self.deg), dtype=np.int32)])
+        if not self.alive[node]:
+            self.alive[node] = True
+            self.deg[node] = 0
+            self._number_of_nodes += 1
+        self.size = max(self.size, node + 1)
+        return node
+
+    def add_nodes_from(self, nodes):
+        for node in nodes:
+            self.add_node(node)
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def add_edge(self, u, v):
+        if self.has_edge(u, v):
+            return
+        self.extra.setdefault(u, set()).add(v)
+        self.extra.setdefault(v, set()).add(u)
+        self.deg[u] += 1
+        self.deg[v] += 1
+        self._number_of_edges += 1
+
+    def remove_node(self, node):
+        '''
+        Tombstones a vertex; its base edges disappear through the alive mask
+        O(deg(v))
+        '''
+        nbrs = self.neighbors(node)
+        self.deg[nbrs] -= 1
+        for u in self.extra.pop(node, ()):
+            self.extra[u].discard(node)
+
+        self.alive[node] = False
+        self.deg[node] = 0
+        self._number_of_nodes -= 1
+        self._number_of_edges -= len(nbrs)
+
+    def remove_nodes_from(self, nodes):
+        '''
+        remove_node() of many vertices at once
+        O(k + sum of their degrees), vectorized over the base rows
+        '''
+        nodes = np.asarray(nodes, dtype=np.int64)
+        removed = np.zeros(len(self.alive), dtype=bool)
+        removed[nodes] = True
+
+        base = nodes[nodes < self.n]
+        starts = self.indptr[base]
+        lengths = self.indptr[base + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        cols = self.indices[np.arange(lengths.sum()) + offsets]
+        extra_cols = [u for node in nodes.tolist() for u in self.extra.get(node, ())]
+        nbrs = np.concatenate([cols[self.alive[cols]], np.array(extra_cols, dtype=np.int64)])
+
+        outside = nbrs[~removed[nbrs]] # every edge leaving the removed set, edges inside it are seen twice
+        self.deg -= np.bincount(outside, minlength=len(self.deg)).astype(np.int32)
+        self._number_of_edges -= len(outside) + (len(nbrs) - len(outside)) // 2
+        for node in nodes.tolist():
+            for u in self.extra.pop(node, ()):
+                if not removed[u]:
+                    self.extra[u].discard(node)
+
+        self.alive[nodes] = False
+        self.deg[nodes] = 0
+        self._number_of_nodes -= len(nodes)
+
+    def degree_rows(self, degree):
+        '''
+        Nodes of exactly the given degree, ascending, and their neighbors as a
+        (k, degree) array, each row sorted as in to_csr
+        O(n + k log k), vectorized over the base rows
+        '''
+        nodes = np.flatnonzero((self.deg[:self.size] == degree) & self.alive[:self.size])
+        base = nodes[nodes < self.n] # nodes are ascending, so row i of base is row i of nodes
+        starts = self.indptr[base]
+        lengths = self.indptr[base + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        cols = self.indices[np.arange(lengths.sum()) + offsets].astype(np.int64)
+        rows = np.repeat(np.arange(len(base)), lengths)
+        keep = self.alive[cols]
+        rows, cols = rows[keep], cols[keep]
+
+        extra_rows, extra_cols = [], []
+        for row, node in enumerate(nodes.tolist()):
+            for v in self.extra.get(node, ()):
+                extra_rows.append(row)
+                extra_cols.append(v)
+        rows = np.concatenate([rows, np.array(extra_rows, dtype=np.int64)])
+        cols = np.concatenate([cols, np.array(extra_cols, dtype=np.int64)])
+
+        order = np.lexsort((cols, rows))
+        return nodes, cols[order].reshape(-1, degree)
+
+    def to_csr(self, dtype=np.int32):
+        '''
+        Exports the current graph as compact CSR arrays of the given dtype
+        Returns (ids, xadj, adjncy) where ids maps compact index -> vertex id
+        O(n + m)
+        '''
+        ids = np.flatnonzero(self.alive[:self.size])
+        index = np.full(self.size, -1, dtype=np.int64)
+        index[ids] = np.arange(len(ids))
+
+        base = ids[ids < self.n]
+        starts = self.indptr[base]
+        lengths = self.indptr[base + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        cols = self.indices[np.arange(lengths.sum()) + offsets]
+        rows = np.repeat(base, lengths)
+        keep = self.alive[cols]
+        rows, cols = rows[keep], cols[keep]
+
+        extra_rows = [u for u, nbrs in self.extra.items() for _ in nbrs]
+        extra_cols = [v for nbrs in self.extra.values() for v in nbrs]
+        rows = np.concatenate([rows, np.array(extra_rows, dtype=np.int64)])
+        cols = np.concatenate([cols, np.array(extra_cols, dtype=np.int64)])
+
+        A = sp.csr_array(
+            (np.ones(len(rows), dtype=np.int8), (index[rows], index[cols])),
+            shape=(len(ids), len(ids))
+        )
+        A.sort_indices()
+        return ids, A.indptr.astype(dtype), A.indices.astype(dtype)
+
+
+def to_csr(graph, dtype=np.int32):
+    '''
+    Compact CSR export of a CSRGraph or an integer-labeled networkx.Graph
+    Returns (ids, xadj, adjncy) where ids maps compact index -> vertex id
+    O(n + m log m), with no per-edge dictionary lookups
+    '''
+    if isinstance(graph, CSRGraph):
+        return graph.to_csr(dtype)
+
+    n = graph.number_of_nodes()
+    ids = np.fromiter(graph.nodes(), dtype=np.int64, count=n)
+    if n == 0:
+        return ids, np.zeros(1, dtype=dtype), np.zeros(0, dtype=dtype)
+    index = np.full(ids.max() + 1, -1, dtype=np.int64)
+    index[ids] = np.arange(n)
+
+    adj = graph.adj
+    nodes = ids.tolist()
+    degrees = np.fromiter((len(adj[node]) for node in nodes), dtype=np.int64, count=n)
+    xadj = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(degrees, out=xadj[1:])
+    cols = index[np.fromiter((u for node in nodes for u in adj[node]), dtype=np.int64, count=xadj[-1])]
+    rows = np.repeat(np.arange(n), degrees)
+    adjncy = cols[np.lexsort((cols, rows))]
+    return ids, xadj.astype(dtype), adjncy.astype(dtype)
+
+
+def degree_rows(graph, degree):
+    '''
+    Nodes of exactly the given degree in a CSRGraph or networkx.Graph, and
+    their neighbors as a (k, degree) array of node ids
+    O(n + k log k) vectorized for CSRGraph, O(n + k * degree) for networkx
+    '''
+    if isinstance(graph, CSRGraph):
+        return graph.degree_rows(degree)
+
+    adj = graph.adj
+    nodes = [node for node, d in graph.degree() if d == degree]
+    neighbors = np.fromiter((u for node in nodes for u in adj[node]), dtype=np.int64, count=len(nodes) * degree)
+    return np.array(nodes, dtype=np.int64), neighbors.reshape(-1, degree)
+
+
+def ball(graph, seeds, radius, limit=None):
+    '''
+    Nodes of a CSRGraph or networkx.Graph within distance radius of the seeds,
+    or None once more than limit nodes were reached
+    O(sum of the degrees inside the ball)
+    '''
+    nodes = set(seeds)
+    frontier = list(nodes)
+    for _ in range(radius):
+        frontier = [u for node in frontier for u in graph.neighbors(node) if u not in nodes]
+        nodes.update(frontier)
+        if limit is not None and len(nodes) > limit:
+            return None
+    return nodes
+
+
+def induced_csr(graph, nodes, dtype=np.int32):
+    '''
+    Compact CSR export of the subgraph of a CSRGraph or integer-labeled
+    networkx.Graph induced by nodes
+    Returns (ids, xadj, adjncy) as to_csr
+    O(k log k + sum of the nodes' degrees) for k nodes
+    '''
+    ids = np.array(sorted(nodes), dtype=np.int64)
+    index = dict(zip(ids.tolist(), range(len(ids))))
+    rows, cols = [], []
+    for i, node in enumerate(ids.tolist()):
+        for u in graph.neighbors(node):
+            j = index.get(u)
+            if j is not None:
+                rows.append(i)
+                cols.append(j)
+    A = sp.csr_array((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(ids), len(ids)))
+    A.sort_indices()
+    return ids, A.indptr.astype(dtype), A.indices.astype(dtype)
+
+
+def permuted_pattern(graph, order):
+    '''
+    Adjacency pattern of an input graph (networkx.Graph or unmodified CSRGraph)
+    with rows and columns in the given order of node labels
+    '''
+    if isinstance(graph, CSRGraph):
+        perm = graph.label_index(order)
+        A = sp.csr_array((np.ones(len(graph.indices), dtype=np.int8), graph.indices, graph.indptr), shape=(graph.n, graph.n))
+        A = A[perm][:, perm]
+    else:
+        A = nx.to_scipy_sparse_array(graph, nodelist=order, weight=None, format='csr')
+    A.sort_indices()
+    return A
@@ -0,0 +1,225 @@
+import numpy as np
+import scipy.sparse as sp
+import heapq
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .csr_graph import CSRGraph
+from .pipeline import variant, variant_recipe, rebuild_variant
+from .symbolic import elimination_tree
+from .orderers import ORDERERS, metis_nested_dissection, INDEX_DTYPE
+
+DISSECTION_THRESHOLD = 10000
+SEPARATOR_BALANCE = 2 / 3 # largest part of a top-level split, as a fraction of the vertices outside the separator
+
+
+class Dissection:
+    '''
+    Node of a recursive reduce-then-dissect ordering.
+
+    The node's graph is first reduced with the test's reductions. If the reduced
+    graph has at most `threshold` vertices it is ordered by the test's orderer.
+    Otherwise only the top level of METIS's nested dissection is kept: its
+    separator, and the parts it splits the graph into, which become child nodes
+    and are reduced again, since splitting exposes new degree-2 chains, twins and
+    simplicial vertices.
+    The ordering of a node is its children's orderings followed by the separator,
+    expanded through the node's reductions as in get_ordering.
+
+    Vertices of a node's graph are labeled by vertex ids of its parent's reduced
+    graph, and vweights counts the input vertices each stands for.
+    '''
+
+    def __init__(self, graph: CSRGraph, vweights):
+        self.graph = graph
+        self.vweights = vweights
+
+        self.reducer = None # preMETIS instance reducing graph
+        self.separator = [] # reducer vertex ids, eliminated after all children
+        self.children = []
+        self.ordering = None # labels of graph in elimination order
+
+        self.reductions = {}
+        self.operations = {}
+        self.metis_time = 0
+
+    def split(self, test, threshold):
+        '''
+        Reduces the graph, then orders it directly if it is small enough,
+        otherwise creates the child nodes
+        '''
+        self.reducer = test(self.graph)
+        self.reductions = dict(self.reducer.reductions)
+        self.operations = dict(self.reducer.operations)
+
+        ids, xadj, adjncy, vweights = self._reduced_graph()
+        if len(ids) == 0: # reduced away entirely, the orderers cannot take an empty graph
+            self.ordering = self.reducer.get_ordering([], [])
+            return
+
+        weights = vweights.astype(INDEX_DTYPE) if self.reducer.weighted_metis else None
+        perm = parts = None
+        if len(ids) > threshold:
+            perm = self._order(metis_nested_dissection, xadj, adjncy, weights)
+            parts = _top_level_parts(xadj, adjncy, perm)
+        if parts is None: # small enough, or METIS did not split it
+            if perm is None or test.orderer != 'metis':
+                perm = self._order(ORDERERS[test.orderer], xadj, adjncy, weights)
+            top = ids[perm].tolist()
+            self.ordering = self.reducer.get_ordering(range(len(top)), top)
+            return
+
+        self.separator = ids[perm[parts[perm] == -1]].tolist()
+        A = sp.csr_array((np.ones(len(adjncy), dtype=np.int8), adjncy, xadj), shape=(len(ids), len(ids)))
+        for part in range(parts.max() + 1):
+            part = np.flatnonzero(parts == part)
+            sub = A[part][:, part]
+            sub.sort_indices()
+            graph = CSRGraph(sub.indptr.astype(np.int64), sub.indices.astype(np.int32), ids[part])
+            self.children.append(Dissection(graph, vweights[part]))
+
+    def assemble(self):
+        '''
+        Orders a split node from its children's orderings, bottom up
+        '''
+        if self.ordering is not None:
+            return
+        for child in self.children:
+            child.assemble()
+            for func, count in child.reductions.items():
+                self.reductions[func] = self.reductions.get(func, 0) + count
+            for func, count in child.operations.items():
+                self.operations[func] = self.operations.get(func, 0) + count
+            self.metis_time += child.metis_time
+
+        top = [node for child in self.children for node in child.ordering] + self.separator
+        self.ordering = self.reducer.get_ordering(range(len(top)), top)
+
+    def _order(self, orderer, xadj, adjncy, weights):
+        start = time.perf_counter()
+        perm = orderer(xadj, adjncy, weights)
+        self.metis_time += time.perf_counter() - start
+        return perm
+
+    def solve(self, test, threshold):
+        self.split(test, threshold)
+        for child in self.children:
+            child.solve(test, threshold)
+        self.assemble()
+
+    def _reduced_graph(self):
+        '''
+        Compact CSR export of the reduced graph with its vertex weights,
+        summed over the input vertices each vertex stands for
+        O(n + m)
+        '''
+        graph = self.reducer.graph
+        ids, xadj, adjncy = graph.to_csr(INDEX_DTYPE)
+        index = np.full(graph.size, -1, dtype=np.int64)
+        index[ids] = np.arange(len(ids))
+        rep = index[self.reducer.reduction_mapping.roots()[:graph.n]] # -1 once eliminated
+
+        vweights = np.bincount(rep[rep >= 0], weights=self.vweights[rep >= 0], minlength=len(ids))
+        return ids, xadj, adjncy, vweights.astype(np.int64)
+
+
+def reduce_then_dissect(graph, test, threshold=DISSECTION_THRESHOLD, jobs=1):
+    '''
+    Recursive reduce-then-dissect ordering of graph (networkx.Graph or CSRGraph)
+    with the reductions of test. Returns the root Dissection; its ordering lists
+    the graph's nodes in elimination order, and its reductions, operations and
+    metis_time are totals over the whole tree.
+
+    With jobs > 1 the top of the tree is split in this process until there is a
+    subproblem per worker, and the subproblems are solved in a process pool.
+    '''
+    test = variant(test, backend='csr', prefix_cache=None)
+    if not isinstance(graph, CSRGraph):
+        graph = CSRGraph.from_networkx(graph)
+    root = Dissection(graph, np.ones(graph.n, dtype=np.int64))
+
+    if jobs <= 1:
+        root.solve(test, threshold)
+        return root
+
+    frontier = deque([root])
+    while frontier and len(frontier) < jobs:
+        node = frontier.popleft()
+        node.split(test, threshold)
+        frontier.extend(node.children)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            (node, pool.submit(_solve, variant_recipe(test), node.graph.indptr, node.graph.indices,
+                               node.graph.labels, node.vweights, threshold))
+            for node in frontier
+        ]
+        for node, future in futures:
+            node.ordering, node.reductions, node.operations, node.metis_time = future.result()
+
+    root.assemble()
+    return root
+
+
+def _solve(recipe, indptr, indices, labels, vweights, threshold):
+    node = Dissection(CSRGraph(indptr, indices, labels), vweights)
+    node.solve(rebuild_variant(recipe), threshold)
+    return node.ordering, node.reductions, node.operations, node.metis_time
+
+
+def _top_level_parts(xadj, adjncy, perm):
+    '''
+    Top level of a nested dissection ordering, read off its elimination tree.
+    The vertices before position c induce one component per subtree of the tree
+    hanging below position c. The separator is eliminated last, so it is the
+    shortest suffix of the ordering whose removal leaves no component with more
+    than SEPARATOR_BALANCE of the other vertices, and the components are the
+    parts. Vertices cut off by fewer separator vertices, whose neighbors all lie
+    in the separator, do not make a split; walking the suffix as a path of the
+    tree instead would run on into the separators nested in the last part.
+    Returns the part of every vertex (-1 for the separator), or None if the
+    ordering does not split the graph.
+    O(m α(m, n) + n log n)
+    '''
+    parent = elimination_tree(xadj, adjncy, perm).tolist()
+    n = len(parent)
+    size = [1] * n
+    children = [[] for _ in range(n)]
+    for j, p in enumerate(parent): # children come before their parents
+        if p != -1:
+            size[p] += size[j]
+            children[p].append(j)
+
+    # components of the prefix perm[:chain], largest first; roots at or after chain are stale
+    components = [(-size[j], j) for j in range(n) if parent[j] == -1]
+    heapq.heapify(components)
+    count = len(components)
+    chain = n # the separator is perm[chain:]
+    while True:
+        while components and components[0][1] >= chain:
+            heapq.heappop(components)
+        if not components:
+            return None
+        if count >= 2 and -components[0][0] <= SEPARATOR_BALANCE * chain:
+            break
+        chain -= 1 # perm[chain], a root of the prefix, leaves it and its children become roots
+        count += len(children[chain]) - 1
+        for child in children[chain]:
+            heapq.heappush(components, (-size[child], child))
+
+    labels = [-1] * n
+    parts = 0
+    for j in range(chain - 1, -1, -1): # parents first, parent[j] > j
+        p = parent[j]
+        if p == -1 or p >= chain:
+            labels[j] = parts
+            parts += 1
+        else:
+            labels[j] = labels[p]
+
+    if parts < 2:
+        return None
+    part_of = np.empty(n, dtype=np.int64)
+    part_of[perm] = labels
+    return part_of
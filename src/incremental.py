@@ -0,0 +1,319 @@
+import networkx as nx
+import numpy as np
+
+from .csr_graph import CSRGraph, to_csr, induced_csr
+from .symbolic import elimination_tree
+from .orderers import ORDERERS, INDEX_DTYPE
+
+ROOT = -1 # virtual parent of the roots of the separator tree
+
+
+class IncrementalOrdering:
+    '''
+    Ordering of a graph kept up to date under batches of edge insertions and
+    deletions, without reducing and ordering the whole graph again.
+
+    The state is the Pipeline that reduced the graph, and a separator tree over
+    its reduced graph: the elimination tree of the reduced graph's ordering, in
+    which every subtree is only adjacent to its ancestors, so any subtree can be
+    ordered again on its own and stay in place. An update
+    - undoes the reductions (contractions and eliminations) covering an edited
+      endpoint or an input neighbor of an undone reduction, and puts their input
+      vertices back into the reduced graph as they are in the input graph;
+    - runs the pipeline's steps around these vertices, see Pipeline.reduce_around;
+    - orders again only the subtrees under the lowest common ancestor of each
+      connected group of reduced vertices that were added or changed
+      neighborhood; removed vertices are cut out of the tree.
+    Undoing a reduction keeps the fill edges degree_2_elimination added for it,
+    so the reduced graph stays a supergraph of the exact one. The reduction
+    counters keep counting the reductions made again.
+
+    Both graphs are kept as networkx.Graph, since CSRGraph cannot give a removed
+    input vertex back its edges.
+    '''
+
+    def __init__(self, graph, reducer):
+        '''
+        graph is the input graph (networkx.Graph or CSRGraph) reduced by reducer,
+        a Pipeline instance. reducer is updated in place.
+        O(n + m) plus the orderer on the reduced graph
+        '''
+        self.graph = graph.to_networkx() if isinstance(graph, CSRGraph) else nx.convert_node_labels_to_integers(graph)
+        self.reducer = reducer
+        if isinstance(reducer.graph, CSRGraph):
+            reducer.graph = _to_networkx(reducer.graph)
+        self.index = dict(zip(reducer.labels.tolist(), range(len(reducer.labels))))
+        self.orderer = ORDERERS[reducer.orderer]
+
+        self.parent = {} # separator tree over the vertices of the reduced graph
+        self.children = {ROOT : []}
+        self._order(*to_csr(reducer.graph, INDEX_DTYPE), ROOT)
+
+    def update(self, inserted=(), deleted=()):
+        '''
+        Inserts and deletes the given edges, pairs of labels of the input graph,
+        and updates the reduction and the separator tree around them.
+        Returns the number of input vertices whose reductions were undone and of
+        reduced vertices ordered again.
+        O(undone region + ordered subtree), plus O(depth of the tree) per changed
+        vertex and O(len(reducer.ordering)) if an elimination is undone
+        '''
+        inserted = [(self.index[u], self.index[v]) for u, v in inserted]
+        deleted = [(self.index[u], self.index[v]) for u, v in deleted]
+        missing = [edge for edge in deleted if not self.graph.has_edge(*edge)]
+        if missing:
+            raise ValueError(f"cannot delete {len(missing)} edges not in the graph, e.g. {missing[0]}")
+        self.graph.remove_edges_from(deleted)
+        self.graph.add_edges_from((u, v) for u, v in inserted if u != v)
+
+        region, boundary, dissolved = self._dissolve({node for edge in inserted + deleted for node in edge})
+        removed = self._reinsert(region, dissolved)
+
+        reducer = self.reducer
+        eliminated, first = len(reducer.ordering), len(reducer.reduction_mapping.parent)
+        changed = reducer.reduce_around(region | boundary)
+        removed.extend(reducer.ordering[eliminated:])
+        removed.extend(node for new_node in range(first, len(reducer.reduction_mapping.parent))
+                       for node in reducer.reduction_mapping[new_node])
+
+        touched = region | boundary | changed
+        touched.update(removed)
+        reordered = self._reorder(touched)
+        return {'region' : len(region), 'reordered' : reordered}
+
+    def ordering(self):
+        '''
+        Labels of the input graph in elimination order: the reducer's eliminations,
+        then the separator tree in postorder, which has the same fill as the
+        orderings the tree was built from
+        O(n)
+        '''
+        order = []
+        stack = [(root, False) for root in reversed(self.children[ROOT])]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                order.append(node)
+                continue
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(self.children.get(node, ())))
+        return self.reducer.get_ordering(range(len(order)), order)
+
+    def _dissolve(self, endpoints):
+        '''
+        Input vertices whose reductions must be undone: the endpoints, and every
+        vertex of a reduction covering them or an input neighbor of them, grown
+        until only unreduced vertices of the reduced graph are next to them.
+        Returns (region, boundary, dissolved): these input vertices, the unreduced
+        vertices next to them, and the undone reductions' outermost ids
+        O(size of the undone reductions + their degrees)
+        '''
+        mapping = self.reducer.reduction_mapping
+        reduced = self.reducer.graph
+        region, boundary, dissolved = set(), set(), set()
+        stack = list(endpoints)
+        while stack:
+            node = stack.pop()
+            if node in region:
+                continue
+            top = mapping.find(node)
+            reduced_node = top != node or not reduced.has_node(node)
+            if not reduced_node and node not in endpoints:
+                boundary.add(node)
+                continue
+            members = [node]
+            if reduced_node:
+                dissolved.add(top)
+                members = self._leaves(top)
+            region.update(members)
+            stack.extend(neighbor for member in members for neighbor in self.graph.neighbors(member) if neighbor not in region)
+        return region, boundary - region, dissolved
+
+    def _leaves(self, node):
+        mapping = self.reducer.reduction_mapping
+        leaves, stack = [], [node]
+        while stack:
+            node = stack.pop()
+            if node in mapping:
+                stack.extend(mapping[node])
+            else:
+                leaves.append(node)
+        return leaves
+
+    def _reinsert(self, region, dissolved):
+        '''
+        Replaces the undone reductions in the reducer by their input vertices,
+        joined as in the input graph to each other and to the outermost
+        supernodes of their other neighbors.
+        Returns the vertices removed from the reduced graph
+        '''
+        reducer = self.reducer
+        mapping = reducer.reduction_mapping
+        reduced = reducer.graph
+
+        removed = [node for node in dissolved | region if reduced.has_node(node)]
+        reduced.remove_nodes_from(removed)
+        undone = dissolved.difference(removed) # eliminated vertices and supernodes
+        if undone:
+            reducer.ordering = [node for node in reducer.ordering if node not in undone]
+        for node in dissolved:
+            reducer.path_compression_nodes.pop(node, None)
+        for node in region:
+            mapping.parent[node] = -1
+            mapping.root[node] = node
+
+        reduced.add_nodes_from(region)
+        for node in region:
+            for neighbor in self.graph.neighbors(node):
+                if neighbor not in region:
+                    neighbor = mapping.find(neighbor)
+                    if not reduced.has_node(neighbor): # eliminated before, and not next to the region then
+                        continue
+                reduced.add_edge(node, neighbor)
+        return removed
+
+    def _reorder(self, touched):
+        '''
+        Updates the separator tree after the touched vertices of the reduced
+        graph were removed, added or changed neighborhood. Removed vertices are
+        cut out, their children moving up. Every edge added joins two touched
+        vertices, so touched vertices are grouped by the components they induce,
+        and only the subtree under each group's lowest common ancestor in the
+        tree is ordered again, with the group's new vertices.
+        Returns the number of vertices ordered
+        '''
+        reduced = self.reducer.graph
+        for node in touched:
+            if node in self.parent and not reduced.has_node(node):
+                self._cut(node)
+
+        anchors = {} # lowest common ancestor of every group -> new vertices below it
+        for group in self._components({node for node in touched if reduced.has_node(node)}):
+            anchor = self._common_ancestor([node for node in group if node in self.parent])
+            anchors.setdefault(anchor, set()).update(node for node in group if node not in self.parent)
+
+        if ROOT in anchors: # a group spans several trees, the whole graph is ordered again
+            nodes = set(self.parent).union(*anchors.values())
+            self.parent, self.children = {}, {ROOT : []}
+            self._order(*induced_csr(reduced, nodes, INDEX_DTYPE), ROOT)
+            return len(nodes)
+
+        ordered = 0
+        for anchor, nodes in self._outermost(anchors).items():
+            parent = ROOT
+            if anchor is not None: # None collects groups with no vertex in the tree
+                parent = self.parent[anchor]
+                self.children[parent].remove(anchor)
+                stack = [anchor]
+                while stack:
+                    node = stack.pop()
+                    del self.parent[node]
+                    nodes.add(node)
+                    stack.extend(self.children.pop(node, ()))
+            self._order(*induced_csr(reduced, nodes, INDEX_DTYPE), parent)
+            ordered += len(nodes)
+        return ordered
+
+    def _cut(self, node):
+        parent = self.parent.pop(node)
+        self.children[parent].remove(node)
+        for child in self.children.pop(node, ()):
+            self.parent[child] = parent
+            self.children[parent].append(child)
+
+    def _components(self, nodes):
+        '''
+        Connected components of the subgraph of the reduced graph induced by nodes
+        O(sum of the nodes' degrees)
+        '''
+        reduced = self.reducer.graph
+        seen = set()
+        for start in nodes:
+            if start in seen:
+                continue
+            seen.add(start)
+            component, stack = [], [start]
+            while stack:
+                node = stack.pop()
+                component.append(node)
+                for neighbor in reduced.neighbors(node):
+                    if neighbor in nodes and neighbor not in seen:
+                        seen.add(neighbor)
+                        stack.append(neighbor)
+            yield component
+
+    def _outermost(self, anchors):
+        '''
+        Merges the new vertices of every anchor into the highest other anchor
+        above it, whose subtree contains its own
+        O(depth of the tree) per anchor
+        '''
+        merged = {}
+        for anchor, nodes in anchors.items():
+            top = anchor
+            node = anchor
+            while node is not None and node != ROOT:
+                node = self.parent[node]
+                if node in anchors:
+                    top = node
+            merged.setdefault(top, set()).update(nodes)
+        return merged
+
+    def _common_ancestor(self, nodes):
+        '''
+        Lowest common ancestor in the separator tree of the given vertices,
+        ROOT if they lie in different trees, None if there are none
+        O(number of tree vertices between them and their ancestor)
+        '''
+        if not nodes:
+            return None
+        path = [nodes[0]] # the ancestor and everything above it
+        while path[-1] != ROOT:
+            path.append(self.parent[path[-1]])
+        above = set(path)
+        below = {nodes[0]}
+        for node in nodes[1:]:
+            climbed = []
+            while node not in below and node not in above:
+                climbed.append(node)
+                node = self.parent[node]
+            below.update(climbed)
+            if node in above and node != path[0]: # met the path above the ancestor
+                i = path.index(node)
+                below.update(path[:i])
+                above.difference_update(path[:i])
+                path = path[i:]
+        return path[0]
+
+    def _order(self, ids, xadj, adjncy, parent):
+        '''
+        Orders the reduced graph's vertices ids (as CSR arrays) with the reducer's
+        orderer, and hangs the elimination tree of the ordering below parent
+        '''
+        if len(ids) == 0: # reduced away entirely, the orderers cannot take an empty graph
+            return
+        mapping = self.reducer.reduction_mapping
+        weights = None
+        if self.reducer.weighted_metis and len(mapping): # only the weights of ids, as in vertex_weights()
+            weights = np.frombuffer(mapping.weights, dtype=np.int64)[ids].astype(INDEX_DTYPE)
+        perm = self.orderer(xadj, adjncy, weights)
+        tree = elimination_tree(xadj, adjncy, perm)
+        order = ids[perm]
+        parents = np.where(tree >= 0, order[np.maximum(tree, 0)], parent)
+        for node, node_parent in zip(order.tolist(), parents.tolist()):
+            self.parent[node] = node_parent
+            self.children.setdefault(node_parent, []).append(node)
+
+
+def _to_networkx(graph):
+    '''
+    networkx.Graph of the current vertices and edges of a CSRGraph, keeping their ids
+    '''
+    ids, xadj, adjncy = graph.to_csr(np.int64)
+    result = nx.Graph()
+    result.add_nodes_from(ids.tolist())
+    rows = np.repeat(ids, np.diff(xadj))
+    cols = ids[adjncy]
+    upper = rows < cols
+    result.add_edges_from(zip(rows[upper].tolist(), cols[upper].tolist()))
+    return result
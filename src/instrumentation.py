@@ -0,0 +1,81 @@
+import time
+import tracemalloc
+from functools import wraps
+
+
+class StageRecorder:
+    '''
+    Wall time, CPU time, peak traced memory and graph size of preMETIS stages.
+
+    Stages are methods wrapped by instrument(); nested calls are recorded under
+    their caller's path ("simplicial_reduction;eliminate_node"), in the folded
+    stack format of flame graphs. Repeated calls of a stage are aggregated.
+    Memory and graph sizes are only taken for outermost stages, since
+    number_of_edges() is not O(1) on networkx graphs.
+    '''
+
+    def __init__(self, owner, memory=True):
+        self.owner = owner
+        self.memory = memory
+        self.stages = {}
+        self.stack = []
+        self._started_tracing = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def wrap(self, method, name):
+        @wraps(method)
+        def wrapped(*args, **kwargs):
+            outermost = not self.stack
+            path = f"{self.stack[-1]};{name}" if self.stack else name
+            self.stack.append(path)
+            if outermost:
+                before = self._sizes()
+                if self.memory:
+                    tracemalloc.reset_peak()
+                    baseline = tracemalloc.get_traced_memory()[0]
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+                self.stack.pop()
+
+                stage = self.stages.get(path)
+                if stage is None:
+                    stage = self.stages[path] = {'calls' : 0, 'wall' : 0.0, 'cpu' : 0.0}
+                stage['calls'] += 1
+                stage['wall'] += wall
+                stage['cpu'] += cpu
+                if outermost:
+                    after = self._sizes()
+                    stage.setdefault('nodes_before', before[0])
+                    stage.setdefault('edges_before', before[1])
+                    stage['nodes_after'], stage['edges_after'] = after
+                    if self.memory:
+                        peak = tracemalloc.get_traced_memory()[1] - baseline
+                        stage['peak_bytes'] = max(stage.get('peak_bytes', 0), peak)
+        return wrapped
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _sizes(self):
+        graph = self.owner.graph
+        return graph.number_of_nodes(), graph.number_of_edges()
+
+
+def instrument(owner, names, memory=True):
+    '''
+    Shadows the given methods of owner with recording wrappers and returns the
+    recorder. Uninstrumented instances keep calling the plain methods, so
+    instrumentation costs nothing unless it is enabled.
+    '''
+    recorder = StageRecorder(owner, memory)
+    for name in names:
+        setattr(owner, name, recorder.wrap(getattr(owner, name), name))
+    return recorder
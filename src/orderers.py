@@ -0,0 +1,86 @@
+import numpy as np
+import pymetis
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+try:
+    from sksparse.cholmod import analyze
+except ImportError: # only needed for the 'amd' and 'colamd' orderers
+    analyze = None
+
+from .buckets import BucketQueue
+
+INDEX_DTYPE = pymetis.zero_copy_dtype() # METIS's idx_t, passed without copying
+
+
+def metis_nested_dissection(xadj, adjncy, vweights=None):
+    '''
+    METIS_NodeND, which takes no edge weights
+    '''
+    perm, _ = pymetis.nested_dissection(pymetis.CSRAdjacency(xadj, adjncy), vweights=vweights)
+    return np.asarray(perm, dtype=np.int64) # perm lists vertices in elimination order, iperm is its inverse
+
+
+def reverse_cuthill_mckee_ordering(xadj, adjncy, vweights=None):
+    '''
+    Bandwidth-reducing ordering from SciPy, ignores vweights
+    '''
+    return reverse_cuthill_mckee(_pattern(xadj, adjncy), symmetric_mode=True).astype(np.int64)
+
+
+def cholmod_amd(xadj, adjncy, vweights=None):
+    return _cholmod_ordering(xadj, adjncy, 'amd')
+
+
+def cholmod_colamd(xadj, adjncy, vweights=None):
+    return _cholmod_ordering(xadj, adjncy, 'colamd')
+
+
+def minimum_degree(xadj, adjncy, vweights=None):
+    '''
+    Exact minimum degree on the explicit elimination graph, ties broken
+    arbitrarily, ignores vweights
+    O(n + sum of deg(v)^2 at elimination), i.e. proportional to the fill
+    '''
+    n = len(xadj) - 1
+    adj = [set(adjncy[xadj[v]:xadj[v + 1]].tolist()) for v in range(n)]
+    queue = BucketQueue()
+    for v in range(n):
+        queue.update(v, len(adj[v]))
+
+    order = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        v = queue.pop_min()
+        order[k] = v
+        nbrs = adj[v]
+        for u in nbrs: # the neighborhood becomes a clique
+            adj[u].discard(v)
+            adj[u] |= nbrs
+            adj[u].discard(u)
+            queue.update(u, len(adj[u]))
+        adj[v] = None
+    return order
+
+
+# Fill-reducing ordering backends: each takes the graph as CSR arrays (xadj, adjncy)
+# and optional vertex weights, and returns the vertices 0..n-1 in elimination order
+ORDERERS = {
+    'metis' : metis_nested_dissection,
+    'amd' : cholmod_amd,
+    'colamd' : cholmod_colamd,
+    'rcm' : reverse_cuthill_mckee_ordering,
+    'mindegree' : minimum_degree,
+}
+
+
+def _pattern(xadj, adjncy):
+    n = len(xadj) - 1
+    return sp.csr_array((np.ones(len(adjncy), dtype=np.int8), adjncy, xadj), shape=(n, n))
+
+
+def _cholmod_ordering(xadj, adjncy, method):
+    if analyze is None:
+        raise ImportError(f"the '{method}' orderer requires scikit-sparse")
+    n = len(xadj) - 1
+    A = (_pattern(xadj, adjncy).astype(float) + sp.eye(n)).tocsc() # only the pattern is analyzed
+    return np.asarray(analyze(A, ordering_method=method).P(), dtype=np.int64)
@@ -0,0 +1,120 @@
+from .preMETIS import preMETIS
+
+
+class Pipeline(preMETIS):
+    '''
+    preMETIS whose transform is declared as a list of steps,
+    each a (reduction name, keyword arguments) pair.
+
+    By default every step runs once, in order. With fixpoint = True the steps are
+    repeated in rounds, each step only visiting the nodes whose neighborhood
+    changed since it last ran, until a round makes no reduction, max_rounds is
+    reached, or total_operations() exceeds operation_budget.
+    The reductions made by every step in each round are recorded in self.rounds.
+
+    Single-pass pipelines resume from the longest prefix of their steps found in
+    prefix_cache, if one is set, and store a snapshot after every step they run.
+    Instrumented pipelines run every step.
+    '''
+
+    steps = []
+    fixpoint = False
+    max_rounds = None
+    operation_budget = None
+    prefix_cache = None # a PrefixCache shared by single-pass pipelines
+    cached_steps = 0
+
+    def transform(self):
+        if self.fixpoint:
+            self.track_changes(len(self.steps))
+
+        while True:
+            counts = self._run_round()
+            if not self.fixpoint or not any(counts.values()) or self._budget_exhausted():
+                break
+            if self.max_rounds is not None and len(self.rounds) >= self.max_rounds:
+                break
+
+    def _run_round(self):
+        first = not self.rounds
+        caching = not self.fixpoint and self.prefix_cache is not None and not self.instrument_stages # restored steps would not be recorded
+        start, counts = self.prefix_cache.restore(self) if caching else (0, {})
+
+        for i, (func, kwargs) in enumerate(self.steps[start:], start):
+            counts.setdefault(func, 0)
+
+            candidates = None
+            if self.fixpoint:
+                candidates = self.pop_changed(i)
+                if first:
+                    candidates = None # the first round visits every node
+                elif not candidates:
+                    continue
+            if self._budget_exhausted():
+                break
+
+            before = self.reductions[func]
+            if candidates is None:
+                getattr(self, func)(**kwargs)
+            else:
+                getattr(self, func)(candidates=candidates, **kwargs)
+            counts[func] += self.reductions[func] - before
+            if caching:
+                self.prefix_cache.store(self, i + 1, counts)
+
+        self.rounds.append(counts)
+        return counts
+
+    def reduce_around(self, nodes):
+        '''
+        Runs the steps once more, each visiting the given nodes and the nodes
+        changed since it last ran (until no reduction applies if fixpoint),
+        within operation_budget. Used after the graph was changed from outside,
+        around the changed nodes.
+        Returns every node whose neighborhood the pass changed
+        '''
+        self.track_changes(len(self.steps) + 1) # the last set collects every change
+        self._mark_changed(nodes)
+        self._changed[-1].clear()
+        while True:
+            counts = {}
+            for i, (func, kwargs) in enumerate(self.steps):
+                counts.setdefault(func, 0)
+                candidates = self.pop_changed(i)
+                if not candidates:
+                    continue
+                if self._budget_exhausted():
+                    break
+                before = self.reductions[func]
+                getattr(self, func)(candidates=candidates, **kwargs)
+                counts[func] += self.reductions[func] - before
+            self.rounds.append(counts)
+            if not self.fixpoint or not any(counts.values()):
+                return self._changed[-1]
+
+    def _budget_exhausted(self):
+        return self.operation_budget is not None and self.total_operations() >= self.operation_budget
+
+
+def variant(test, name=None, **overrides):
+    '''
+    Subclass of test with some class attributes overridden (backend, fixpoint, ...).
+    The recipe is kept in _variant so worker processes can rebuild the class,
+    which cannot be pickled by reference.
+    '''
+    if '_variant' in test.__dict__: # flatten variants of variants
+        base, base_name, base_overrides = test._variant
+        test, name, overrides = base, name or base_name, {**base_overrides, **overrides}
+
+    cls = type(name or test.__name__, (test,), overrides)
+    cls._variant = (test, name, overrides)
+    return cls
+
+
+def variant_recipe(test):
+    return test.__dict__.get('_variant', (test, None, {}))
+
+
+def rebuild_variant(recipe):
+    test, name, overrides = recipe
+    return variant(test, name, **overrides) if name or overrides else test
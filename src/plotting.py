@@ -4,15 +4,56 @@ import seaborn as sns
 import numpy as np
 import os
 import json
-import glob
-import re
 
-
-def load_results(path="results"):
-    raw_results = _load_all_results(path)
-    flat_results = [_flatten_result(res) for res in raw_results]
-    df = pd.DataFrame(flat_results)
-    return df
+try:
+    import pyarrow # only needed to compact the results into Parquet
+except ImportError:
+    pyarrow = None
+
+from .results_store import ResultsStore
+
+RESULTS_PARQUET = 'results.parquet'
+KEY_COLUMNS = ["graph", "test", "config"]
+NESTED_COLUMNS = ["METIS_runtimes", "Stages"] # stored as JSON strings in Parquet
+
+
+def load_results(path="results", columns=None):
+    '''
+    Flattened results of every completed test, the latest per (graph, test, config).
+    Results appended since the last compaction are compacted first when pyarrow
+    is installed, so only the first load parses the JSONL store and the others
+    read the given columns (all if None) from Parquet. Without pyarrow the
+    results appended since are parsed on every load.
+    '''
+    if pyarrow is not None:
+        compact_results(path)
+    df, offset = _load_compacted(path, columns)
+    records, _ = ResultsStore(path).read('done', offset)
+    return _latest(df, pd.DataFrame([_flatten_result(record) for record in records]), columns)
+
+
+def compact_results(path="results"):
+    '''
+    Rewrites the completed results as Parquet, so that later loads read only the
+    columns they need. The JSONL store is left as is; the byte offset up to which
+    it has been compacted is kept in results.parquet.offset. Requires pyarrow.
+    Does nothing if no result was completed since the last compaction.
+    '''
+    df, offset = _load_compacted(path)
+    records, offset = ResultsStore(path).read('done', offset)
+    if not records:
+        return
+    df = _latest(df, pd.DataFrame([_flatten_result(record) for record in records]))
+
+    parquet_path = os.path.join(path, RESULTS_PARQUET)
+    encoded = df.copy()
+    for column in NESTED_COLUMNS:
+        encoded[column] = encoded[column].map(json.dumps)
+    encoded.to_parquet(parquet_path + ".tmp", index=False)
+    os.replace(parquet_path + ".tmp", parquet_path)
+    with open(parquet_path + ".offset.tmp", "w") as f: # written second, a stale offset only re-reads records
+        f.write(str(offset))
+    os.replace(parquet_path + ".offset.tmp", parquet_path + ".offset")
 
 
 def plot_runtime_vs_reductions_per_graph(results, graphs, tests):
@@ -58,7 +99,8 @@ def plot_operation_flamegraph(df, tests, graphs):
     # Filter the dataframe for the preMETIS tests
     filtered_df = df[df['test'].isin(tests)]
 
-    operation_cols = [col for col in filtered_df.columns if col.startswith("Operation_")]
+    operation_cols = [col for col in filtered_df.columns
+                      if col.startswith("Operation_") and not col.startswith("Operation_fingerprint_")]
 
     # Melt operation components
     melt_df = filtered_df.melt(
@@ -185,10 +227,84 @@ def plot_fillin(df, tests, graphs):
     plt.show()
 
 
+def plot_factorization_cost(df, tests, graphs):
+    # Factorization cost metrics, normalized to METIS like plot_fillin
+    metrics = {
+        'Factorization_Flops': "Flops",
+        'Etree_Height': "Elimination Tree Height",
+        'Supernodes': "Supernodes",
+        'CHOLMOD_Factorize_Time': "CHOLMOD Factorize Time",
+    }
+    metrics = {col: title for col, title in metrics.items() if col in df.columns and df[col].notna().any()}
+    filtered_df = df[df['test'].isin(['METIS'] + tests)]
+
+    fig, axes = plt.subplots(1, len(metrics), figsize=(6 * len(metrics), 6), squeeze=False)
+
+    for ax, (col, title) in zip(axes[0], metrics.items()):
+        pivot_df = filtered_df.pivot(index='graph', columns='test', values=col)
+        norm_df = pivot_df.div(pivot_df['METIS'], axis=0).reset_index()
+        melt_df = norm_df.melt(id_vars='graph', value_vars=tests, var_name='test', value_name='normalized')
+        melt_df = melt_df[melt_df['graph'].isin(graphs)]
+
+        sns.stripplot(
+            data=melt_df,
+            x='graph',
+            y='normalized',
+            hue='test',
+            jitter=False,
+            dodge=True,
+            size=8,
+            palette='Set2',
+            ax=ax
+        )
+        ax.axhline(1.0, color='gray', linestyle='--', linewidth=1)
+        ax.set_title(f"Normalized {title}")
+        ax.set_ylabel(f"{title} / METIS")
+        ax.set_xlabel("Graph")
+
+    plt.tight_layout()
+    plt.show()
+
+
+def plot_stage_flamegraph(df, test, graph, metric='wall'):
+    # Icicle view of the instrumented stages (run with --instrument): each stage spans
+    # its share of `metric` ('wall', 'cpu' or 'calls') inside the stage that called it
+    stages = df[(df['test'] == test) & (df['graph'] == graph)]['Stages'].iloc[0]
+    if not stages:
+        raise ValueError(f"{test} on {graph} was not run with --instrument")
+
+    children = {}
+    for path in stages:
+        parent, _, name = path.rpartition(';')
+        children.setdefault(parent, []).append(path)
+
+    # stages are laid out left to right inside their caller, outermost first
+    offsets = {'': 0.0}
+    fig, ax = plt.subplots(figsize=(16, 4))
+    colors = plt.get_cmap('Set2')
+    for path in sorted(stages, key=lambda p: p.count(';')):
+        parent, _, name = path.rpartition(';')
+        offsets[path] = offsets[parent] + sum(stages[s][metric] for s in children[parent][:children[parent].index(path)])
+        width = stages[path][metric]
+        depth = path.count(';')
+        ax.barh(depth, width, left=offsets[path], height=0.9,
+                color=colors(children[parent].index(path) % 8), edgecolor='white')
+        ax.text(offsets[path] + width / 2, depth, name.replace('_', ' '), ha='center', va='center', fontsize=8, clip_on=True)
+
+    ax.set_yticks(range(max(p.count(';') for p in stages) + 1))
+    ax.set_ylabel("Call Depth")
+    ax.set_xlabel(metric.title())
+    ax.set_title(f"Stage Flame Graph ({test}, {graph})")
+    ax.invert_yaxis()
+    plt.tight_layout()
+    plt.show()
+
+
 def _flatten_result(data):
     flattened = {
         "graph": data["graph"],
         "test": data["test"],
+        "config": data.get("config"),
         "METIS_Runtime": data["METIS Runtime"],
         "METIS_Runtime_Avg": sum(data["METIS runtimes"]) / len(data["METIS runtimes"]),
         "METIS_Runtime_Min": min(data["METIS runtimes"]),
@@ -198,7 +314,19 @@ def _flatten_result(data):
         "Original_Nodes": data["Original Nodes"],
         "Original_NNZ": data["Original NNZ"],
         "Total_Operations": data["Total Operations"],
-        "METIS_runtimes": data.get("METIS runtimes", [])  # <--- this line added
+        "METIS_runtimes": data.get("METIS runtimes", []),  # <--- this line added
+        "Factorization_Flops": data.get("Factorization Flops"),
+        "Etree_Height": data.get("Etree Height"),
+        "Supernodes": data.get("Supernodes"),
+        "CHOLMOD_Analyze_Time": data.get("CHOLMOD Analyze Time"),
+        "CHOLMOD_Factorize_Time": data.get("CHOLMOD Factorize Time"),
+        "Dissection_Runtime": data.get("Dissection Runtime"),
+        "Orderer": data.get("Orderer", "metis"),
+        "Conversion_Time": data.get("Conversion Time"),
+        "METIS_Runtime_Median": data.get("METIS Runtime Stats", {}).get("median"),
+        "METIS_Runtime_CI_Low": data.get("METIS Runtime Stats", {}).get("ci_low"),
+        "METIS_Runtime_CI_High": data.get("METIS Runtime Stats", {}).get("ci_high"),
+        "Stages": data.get("Stages"),
     }
     for k, v in data["Reductions"].items():
         flattened[f"Reduction_{k}"] = v
@@ -206,22 +334,28 @@ def _flatten_result(data):
         flattened[f"Operation_{k}"] = v
     return flattened
 
-def _parse_filename(filepath):
-    filename = os.path.basename(filepath)
-    match = re.match(r"(.+?)_(.+?)_results\.json", filename)
-    if match:
-        return match.group(1), match.group(2)
-    else:
-        raise ValueError(f"Filename {filename} does not match expected pattern.")
-
-def _load_all_results(path="results"):
-    result_files = glob.glob(os.path.join(path, "*_results.json"))
-    results = []
-    for file in result_files:
-        with open(file, 'r') as f:
-            data = json.load(f)
-            graph_name, test_name = _parse_filename(file)
-            data["graph"] = graph_name
-            data["test"] = test_name
-            results.append(data)
-    return results
+def _load_compacted(path, columns=None):
+    '''
+    The compacted results with the given columns, and the offset of the JSONL
+    store they cover
+    '''
+    parquet_path = os.path.join(path, RESULTS_PARQUET)
+    if not os.path.exists(parquet_path):
+        return pd.DataFrame(), 0
+    if columns is not None:
+        columns = list(dict.fromkeys(KEY_COLUMNS + list(columns)))
+    df = pd.read_parquet(parquet_path, columns=columns)
+    for column in NESTED_COLUMNS:
+        if column in df:
+            df[column] = df[column].map(json.loads)
+    with open(parquet_path + ".offset") as f:
+        return df, int(f.read())
+
+def _latest(compacted, appended, columns=None):
+    df = pd.concat([compacted, appended], ignore_index=True)
+    if df.empty:
+        return df
+    df = df.drop_duplicates(KEY_COLUMNS, keep="last").reset_index(drop=True)
+    if columns is not None:
+        df = df.reindex(columns=list(dict.fromkeys(KEY_COLUMNS + list(columns))))
+    return df
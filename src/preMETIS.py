@@ -1,19 +1,56 @@
 import networkx as nx
+import numpy as np
+import heapq
 from functools import lru_cache
-from collections import defaultdict
+from collections import deque
+
+from .csr_graph import CSRGraph, to_csr, degree_rows, ball, induced_csr
+from .reduction_mapping import ReductionMapping
+from .buckets import BucketQueue
+from .fingerprints import neighborhood_classes
+from .triangles import triangle_groups, simplicial_rounds
+from .chains import degree_2_chains
+from .instrumentation import instrument
 
 
 class preMETIS:
 
+    backend = 'networkx' # 'networkx' or 'csr'
+    orderer = 'metis' # orders the reduced graph, see src/orderers.py
+    weighted_metis = True # weight supernodes by the number of input vertices they contain
+    dissection_threshold = None # if set, order with src/dissection.py, reducing again below every separator
+    dissection_jobs = 1
+    partitions = None # if set, reduce the parts of a k-way partition in parallel, see src/partitioned.py
+    partition_jobs = 1
+    instrument_stages = None # 'time' or 'memory' to record every reduction, see src/instrumentation.py
+    batched_triangles = True # find the triangle_contraction groups with sparse products on CSR graphs, False walks them one at a time
+    batched_paths = True # find all path_compression chains at once, False walks them one at a time
+    batched_simplicial = True # thresholded simplicial_reduction in rounds of sparse triangle counts on CSR graphs, False uses the queue
+    local_fraction = 0.01 # classes and paths given fewer candidates than this fraction of the nodes only look around them
+
     def transform(self):
         raise NotImplementedError
 
-    def __init__(self, graph: nx.Graph):
-        
+    def __init__(self, graph, frozen=None):
+        '''
+        Reduces graph with self.transform(). The frozen vertex ids (0..n-1, in
+        the order of the graph's nodes) are never eliminated or contracted, and
+        never extend a degree-2 chain or a triangle group, since their
+        neighborhoods may continue outside of graph.
+        '''
         self.total_nodes = graph.number_of_nodes()
         self.total_edges = graph.number_of_edges()
 
-        self.graph = graph.copy()
+        # vertices are relabeled to 0..n-1, self.labels maps them back
+        if isinstance(graph, CSRGraph):
+            self.graph = graph.copy() if self.backend == 'csr' else graph.to_networkx()
+            self.labels = graph.labels
+        elif self.backend == 'csr':
+            self.graph = CSRGraph.from_networkx(graph)
+            self.labels = self.graph.labels
+        else:
+            self.labels = np.array(list(graph.nodes()))
+            self.graph = nx.convert_node_labels_to_integers(graph)
         
         self.reductions = {
             'simplicial_reduction' : 0,
@@ -30,17 +67,31 @@ class preMETIS:
             'twin_reduction' : 0,
             'path_compression' : 0,
             'degree_2_elimination' : 0,
-            'triangle_contraction' : 0
+            'triangle_contraction' : 0,
+            'fingerprint_verifications' : 0, # diagnostics, not part of total_operations
+            'fingerprint_collisions' : 0
         }
 
-
-        self.reduction_mapping = {}
+        self.frozen = set(frozen) if frozen is not None else set()
+        self.reduction_mapping = ReductionMapping(self.total_nodes)
         self.path_compression_nodes = {}
+        self._first_leaves = {}
 
         self.ordering = []
+        self.rounds = []
+
+        # per-step sets of nodes whose neighborhood changed, see track_changes
+        self._changed = None
+
+        self.stages = None
+        if self.instrument_stages:
+            self.stages = instrument(self, [*self.reductions, 'contract_nodes', 'eliminate_node', 'contract_groups', 'eliminate_nodes'],
+                                     memory=self.instrument_stages == 'memory')
 
         # Run the reductions specified in self.transform()
         self.transform()
+        if self.stages is not None:
+            self.stages.close()
 
 
     def eliminate_node(self, node, func):
@@ -51,10 +102,25 @@ class preMETIS:
         self.operations[func] += self.graph.degree(node) # cost of popping a node
         self.reductions[func] += 1
 
+        if self._changed is not None:
+            self._mark_changed(self.graph.neighbors(node))
         self.graph.remove_node(node)
         self.ordering.append(node)
 
 
+    def eliminate_nodes(self, nodes, func):
+        '''
+        eliminate_node() of many nodes at once, in the given order
+        O(k + their total degree)
+        '''
+        if self._changed is not None:
+            self._mark_changed({n for node in nodes for n in self.graph.neighbors(node)})
+        edges = self.graph.number_of_edges()
+        self.graph.remove_nodes_from(nodes)
+        self.operations[func] += edges - self.graph.number_of_edges() # cost of popping the nodes
+        self.reductions[func] += len(nodes)
+        self.ordering.extend(nodes)
+
     def contract_nodes(self, nodes, func):
         '''
         This reduces a set of nodes into 1
@@ -63,127 +129,270 @@ class preMETIS:
 
         self.reductions[func] += len(nodes) - 1 # number of reductions
 
-        new_node = ""
         neighbors = set()
         for node in nodes:
-            new_node += f"_{node}"
             neighbors |= set(self.graph.neighbors(node))
 
             self.operations[func] += self.graph.degree(node) # cost of checking neighbors and popping edge
             self.graph.remove_node(node)
 
         neighbors -= set(nodes)
+        new_node = self.reduction_mapping.add(nodes)
         self.graph.add_node(new_node)
         for n in neighbors:
             self.graph.add_edge(new_node, n)
         self.operations[func] += self.graph.degree(new_node) # cost of adding new_node
 
-
-        self.reduction_mapping[new_node] = nodes
+        if self._changed is not None:
+            self._mark_changed(neighbors | {new_node})
         return new_node
+
+    def contract_groups(self, members, sizes, leaving, func):
+        '''
+        contract_nodes() of many disjoint groups at once. members lists the nodes
+        of every group one after the other and sizes the number of nodes of each;
+        leaving holds a (group index, outer node) row for every edge leaving a
+        group, whose outer nodes must lie outside all groups.
+        O(total size + total degree), with bulk graph updates
+        '''
+        members = np.asarray(members, dtype=np.int64)
+        self.reductions[func] += len(members) - len(sizes)
+        nodes = members.tolist()
+        degrees = sum(degree for _, degree in self.graph.degree(nodes))
+        self.operations[func] += (degrees + len(leaving)) // 2 # cost of checking neighbors and popping edges
+        self.graph.remove_nodes_from(nodes)
+
+        new_nodes = self.reduction_mapping.add_groups(members, sizes)
+        group, outer = np.unique(leaving, axis=0).T if len(leaving) else (np.empty(0, dtype=np.int64),) * 2
+        self.graph.add_nodes_from(new_nodes.tolist())
+        self.graph.add_edges_from(zip(new_nodes[group].tolist(), outer.tolist()))
+        self.operations[func] += len(outer) # cost of adding the new nodes
+
+        if self._changed is not None:
+            self._mark_changed(new_nodes.tolist() + outer.tolist())
+        return new_nodes
+
+    def add_fill_edge(self, u, v):
+        '''
+        Adds the edge (u, v) created by eliminating a common neighbor
+        O(1), O(deg(u)) while tracking changes
+        '''
+        self.graph.add_edge(u, v)
+        if self._changed is not None: # u, v and every node seeing both changed
+            self._mark_changed([u, v] + [w for w in self.graph.neighbors(u) if self.graph.has_edge(w, v)])
+
+    def track_changes(self, num_steps):
+        '''
+        Starts recording, for each of num_steps pipeline steps, the nodes whose
+        neighborhood changed since that step last ran
+        '''
+        self._changed = [set() for _ in range(num_steps)]
+
+    def pop_changed(self, step):
+        changed, self._changed[step] = self._changed[step], set()
+        return changed
+
+    def _mark_changed(self, nodes):
+        nodes = list(nodes)
+        for changed in self._changed:
+            changed.update(nodes)
+
+    def _candidate_nodes(self, candidates):
+        '''
+        The nodes a reduction should visit: all nodes, or the given candidates
+        that are still in the graph, except the frozen ones
+        '''
+        if candidates is None:
+            nodes = self.graph.nodes()
+        else:
+            nodes = [node for node in candidates if self.graph.has_node(node)]
+        if self.frozen:
+            nodes = [node for node in nodes if node not in self.frozen]
+        return list(nodes)
+
+    def _degree_rows(self, degree):
+        '''
+        degree_rows() of the graph without the frozen nodes
+        '''
+        nodes, neighbors = degree_rows(self.graph, degree)
+        if self.frozen:
+            free = ~np.isin(nodes, list(self.frozen))
+            nodes, neighbors = nodes[free], neighbors[free]
+        return nodes, neighbors
+
+    def _reachable_rows(self, candidates, degree):
+        '''
+        _degree_rows() restricted to the nodes reachable from the candidates
+        through non-frozen nodes of the given degree
+        O(k * degree) for k reachable nodes
+        '''
+        nodes = []
+        seen = set()
+        stack = [node for node in self._candidate_nodes(candidates) if self.graph.degree(node) == degree]
+        while stack:
+            x = stack.pop()
+            if x in seen:
+                continue
+            seen.add(x)
+            nodes.append(x)
+            stack.extend(y for y in self.graph.neighbors(x)
+                         if y not in seen and y not in self.frozen and self.graph.degree(y) == degree)
+        neighbors = np.array([y for x in nodes for y in self.graph.neighbors(x)], dtype=np.int64).reshape(-1, degree)
+        return np.array(nodes, dtype=np.int64), neighbors
+
+    def _is_local(self, candidates):
+        return candidates is not None and len(candidates) < self.local_fraction * self.graph.number_of_nodes()
         
 
-    def simplicial_reduction(self, degree_threshold=-1):
+    def simplicial_reduction(self, degree_threshold=-1, exhaustive=True, candidates=None):
         '''
         Removes nodes with a clique neighborhood.
-        Iterates through all nodes once, so misses potentially created cliques.
+        Works through a queue seeded with all nodes; after each elimination only the
+        neighbors of the eliminated node are re-enqueued, so cliques created by earlier
+        eliminations are found as well. exhaustive=False stops after the first pass.
+        With a degree threshold on a CSR graph, the nodes are instead tested in
+        batches, see _simplicial_rounds; networkx graphs keep the queue, since
+        exporting them costs more than the queue saves.
         O(n * d^2), where d is the degree threshold
         '''
-        removed = set()
-        for node in list(self.graph.nodes()):
+        if self.batched_simplicial and degree_threshold != -1 and isinstance(self.graph, CSRGraph):
+            return self._simplicial_rounds(degree_threshold, exhaustive, candidates)
+
+        queue = deque(self._candidate_nodes(candidates))
+        queued = set(queue)
+
+        while queue:
+            node = queue.popleft()
+            queued.discard(node)
 
             if degree_threshold != -1 and self.graph.degree(node) > degree_threshold:
                 continue
 
             neighbors = list(self.graph.neighbors(node))
-            deg = len(neighbors)
-
-            self.operations['simplicial_reduction'] += deg * (deg - 1) // 2
-
-            if self.graph.subgraph(neighbors).number_of_edges() == deg * (deg - 1) // 2:
-                removed.add(node)
-                self.eliminate_node(node, 'simplicial_reduction')
+            if not self._is_clique(neighbors, 'simplicial_reduction'):
+                continue
 
+            self.eliminate_node(node, 'simplicial_reduction')
+            if exhaustive:
+                for n in neighbors:
+                    if n not in queued and n not in self.frozen:
+                        queue.append(n)
+                        queued.add(n)
 
-    def indistinguishable_reduction(self):
+    def _simplicial_rounds(self, degree_threshold, exhaustive, candidates):
         '''
-        Reduces node pairs with an identical closed neighborhood
-        O(m + m*deg(v))
+        simplicial_reduction on an exported copy of the graph: every round tests
+        all queued nodes at once by their triangle counts and eliminates every
+        simplicial one, see src/triangles.py. The eliminations are applied to the
+        graph in one bulk removal at the end.
+        O(n + m) for the export, plus O(d^2) work per tested node
         '''
-        hashes = { 
-            node : sum(hash(n) for n in set(self.graph.neighbors(node)) | {node})
-            for node in self.graph.nodes()
-            }
-        
-        self.operations['indistinguishable_reduction'] += 2*len(self.graph.edges) # cost of creating hashes
-        
-        to_reduce = defaultdict(set)
-
-        for (u, v) in list(self.graph.edges()):
-           
-            if hashes[u] == hashes[v]: # worth comparing now
-                
-                self.operations['indistinguishable_reduction'] += max(self.graph.degree(u), self.graph.degree(v)) # cost of comparing neighbors
-                
-                if set(self.graph.neighbors(u)) | {u} == set(self.graph.neighbors(v)) | {v}:
-                    to_reduce[hashes[u]].update({u, v})
-                
-            else: self.operations['indistinguishable_reduction'] += 1 # cost of iterating
-        
-        for reduce_group in to_reduce.values():
-            self.contract_nodes(list(reduce_group), "indistinguishable_reduction")
+        ids, xadj, adjncy = to_csr(self.graph, np.int64)
+        seeds = np.arange(len(ids)) if candidates is None else np.flatnonzero(np.isin(ids, list(candidates)))
+        frozen = np.isin(ids, list(self.frozen)) if self.frozen else None
+        eliminated, work = simplicial_rounds(xadj, adjncy, seeds, degree_threshold, exhaustive, frozen)
+        self.operations['simplicial_reduction'] += work # cost of the triangle counts
+        self.eliminate_nodes(ids[eliminated].tolist(), 'simplicial_reduction')
+
+    def _is_clique(self, nodes, func):
+        '''
+        Checks all pairs with direct adjacency tests, stopping at the first missing edge
+        O(d^2)
+        '''
+        for i, u in enumerate(nodes):
+            for v in nodes[i + 1:]:
+                self.operations[func] += 1 # cost of an adjacency test
+                if not self.graph.has_edge(u, v):
+                    return False
+        return True
 
 
-    def twin_reduction(self):
+    def indistinguishable_reduction(self, candidates=None):
         '''
-        Reduces node pairs with an identical open neighborhood
-        O(m + m*deg(v))
+        Reduces node groups with an identical closed neighborhood
+        O(n log n + m)
         '''
-        hashes = { 
-            node : sum(hash(n) for n in self.graph.neighbors(node))
-            for node in self.graph.nodes()
-            }
-        
-        self.operations['twin_reduction'] += 2*len(self.graph.edges) # cost of creating hashes
-        
-        groups = defaultdict(set)
-        for node in self.graph.nodes():
-            key = (self.graph.degree(node), hashes[node])
-            groups[key].add(node)
-        
-        self.operations['twin_reduction'] += 2*len(self.graph.nodes)
-        all_reductions = []
+        self._contract_neighborhood_classes('indistinguishable_reduction', True, candidates)
 
 
-        for group_nodes in groups.values():
-            if len(group_nodes) > 1: # worth comparing now
-                while group_nodes:
-                    u = group_nodes.pop()
-                    to_reduce = [u]
-                    u_neighbors = set(self.graph.neighbors(u))
-                    for v in group_nodes:
-                        self.operations['twin_reduction'] += max(self.graph.degree(u), self.graph.degree(v))
-                        if u_neighbors == set(self.graph.neighbors(v)):
-                            to_reduce.append(v)
-                    if len(to_reduce) > 1:
-                        all_reductions.append(to_reduce)
-                        group_nodes -= set(to_reduce)
-
-        for reduction in all_reductions:
-            self.contract_nodes(reduction, "twin_reduction")
+    def twin_reduction(self, candidates=None):
+        '''
+        Reduces node groups with an identical open neighborhood
+        O(n log n + m)
+        '''
+        self._contract_neighborhood_classes('twin_reduction', False, candidates)
 
+    def _contract_neighborhood_classes(self, func, closed, candidates):
+        '''
+        Contracts the classes found by neighborhood_classes(). A class contains
+        nodes at distance at most 2 from each other, so few candidates only need
+        the subgraph within distance 3 of them: the rows within distance 2 are
+        complete there, and a row cut short cannot match a complete one.
+        Subgraphs reaching hubs fall back to the whole graph.
+        '''
+        nodes = None
+        if self._is_local(candidates):
+            seeds = [node for node in candidates if self.graph.has_node(node)]
+            nodes = ball(self.graph, seeds, 3, limit=10 * self.local_fraction * self.graph.number_of_nodes())
+        if nodes is not None:
+            ids, indptr, indices = induced_csr(self.graph, nodes)
+        else:
+            ids, indptr, indices = to_csr(self.graph)
+        classes, stats = neighborhood_classes(indptr, indices, closed=closed)
+
+        self.operations[func] += len(indices) # cost of creating fingerprints
+        self.operations[func] += stats['verifications'] # cost of refining candidate groups
+        self.operations['fingerprint_verifications'] += stats['verifications']
+        self.operations['fingerprint_collisions'] += stats['collisions']
+
+        for group in classes:
+            group = ids[group].tolist()
+            if candidates is not None and candidates.isdisjoint(group):
+                continue # classes of unchanged nodes were already contracted
+            if self.frozen:
+                group = [node for node in group if node not in self.frozen]
+                if len(group) < 2:
+                    continue
+            self.contract_nodes(group, func)
 
 
-    def path_compression(self):
+    def path_compression(self, candidates=None):
         '''
         Reduces all paths of degree-2 nodes to one node
+        O(n + m) for finding all chains at once, see src/chains.py
+        '''
+        if not self.batched_paths:
+            return self._path_compression_walk(candidates)
+
+        nodes = self.graph.number_of_nodes() if candidates is None else len(self._candidate_nodes(candidates))
+        self.operations['path_compression'] += nodes # cost of iterating through nodes
+
+        if self._is_local(candidates): # walks out from the candidates to the ends of their chains
+            members, sizes, ends = degree_2_chains(*self._reachable_rows(candidates, 2))
+        else:
+            members, sizes, ends = degree_2_chains(*self._degree_rows(2))
+        if candidates is not None: # chains of unchanged nodes were already compressed
+            chain = np.repeat(np.arange(len(sizes)), sizes)
+            touched = np.bincount(chain, weights=np.isin(members, list(candidates)), minlength=len(sizes)) > 0
+            members, sizes, ends = members[touched[chain]], sizes[touched], ends[touched]
+
+        paths = np.flatnonzero(ends[:, 0] >= 0) # a path leaves through both ends, a cycle not at all
+        leaving = np.stack([np.repeat(paths, 2), ends[paths].ravel()], axis=1)
+        new_nodes = self.contract_groups(members, sizes, leaving, 'path_compression')
+        orientations = zip(*(np.where(ends >= 0, ends, None).T.tolist()))
+        self.path_compression_nodes.update(zip(new_nodes.tolist(), orientations)) # for ordering
+
+    def _path_compression_walk(self, candidates=None):
+        '''
+        path_compression tracing each chain from its first degree-2 node
         O(n*deg(v))
         '''
 
-        self.operations['path_compression'] += self.graph.number_of_nodes() # cost of iterating through nodes
+        nodes = self._candidate_nodes(candidates)
+        self.operations['path_compression'] += len(nodes) # cost of iterating through nodes
         
         reduced = set()
-        for node in list(self.graph.nodes()):
+        for node in nodes:
             if node in reduced: # already compressed
                 continue
             
@@ -199,7 +408,7 @@ class preMETIS:
                 if u in to_reduce:
                     u = None # for cycles
                     break
-                if self.graph.degree(u) != 2:
+                if self.graph.degree(u) != 2 or u in self.frozen:
                     break
 
                 to_reduce.append(u)
@@ -211,7 +420,7 @@ class preMETIS:
                 if v in to_reduce:
                     v = None # for cycles
                     break
-                if self.graph.degree(v) != 2:
+                if self.graph.degree(v) != 2 or v in self.frozen:
                     break
 
                 to_reduce.append(v)
@@ -225,110 +434,219 @@ class preMETIS:
             new_node = self.contract_nodes(to_reduce, 'path_compression')
             self.path_compression_nodes[new_node] = (u, v) # for ordering
 
-    def degree_2_elimination(self):
+    def degree_2_elimination(self, candidates=None):
         '''
         Eliminates all degree-2 nodes from the graph 
         This is an approximate reduction
-        O(n^2) for iterating through the nodes recursively
+        Degree-2 nodes are seeded into degree buckets, and the neighbors of every
+        eliminated node are re-bucketed as they lose or gain edges, so no full
+        sweep is ever repeated.
+        O(n + sum of eliminated degrees)
         '''
+        buckets = BucketQueue()
+        for node in self._candidate_nodes(candidates):
+            self.operations['degree_2_elimination'] += 1 # cost of bucketing
+            if self.graph.degree(node) == 2:
+                buckets.update(node, 2)
 
-        changed = True
-        while changed:
-            changed = False
-            for node in list(self.graph.nodes()):
-                self.operations['degree_2_elimination'] += 1
-                if self.graph.degree(node) == 2:
-                    neighbors = list(self.graph.neighbors(node))
-                    if not self.graph.has_edge(neighbors[0], neighbors[1]):
-                        self.graph.add_edge(neighbors[0], neighbors[1])
-                    self.eliminate_node(node, 'degree_2_elimination')
-                    changed = True 
+        while buckets.bucket_size(2):
+            node = buckets.pop(2)
+            self.operations['degree_2_elimination'] += 1
 
-    def triangle_contraction(self):
+            neighbors = list(self.graph.neighbors(node))
+            if not self.graph.has_edge(neighbors[0], neighbors[1]):
+                self.add_fill_edge(neighbors[0], neighbors[1])
+            self.eliminate_node(node, 'degree_2_elimination')
+
+            for n in neighbors:
+                if n not in self.frozen:
+                    buckets.update(n, self.graph.degree(n))
+
+    def triangle_contraction(self, candidates=None):
         '''
-        Reduces all degree-3 neighbors
+        Contracts groups of degree-3 nodes joined by edges that lie on a triangle
         This is an approximate reduction
-        O(m) for iterating through all the edges
+        The groups are found at once on the graph before any contraction, see
+        _triangle_groups, and contracted in the order the walk reaches them. A
+        contraction changes the degrees and neighbors of the nodes next to its
+        supernode, which a group reads only if one of its nodes is within
+        distance 1, so groups with a node within distance 2 of the supernode are
+        grown one at a time instead; the groups are the walk's. Only the
+        degree-3 nodes and the nodes near a contraction are visited.
+        O(n + m) for finding all groups at once, plus the walk around every
+        contraction
+        On networkx graphs the walk is faster, as reading the degree-3 rows costs
+        as much as walking.
         '''
-
-
-        visited = set()
-        
-        for node in list(self.graph.nodes()):
-
+        if not self.batched_triangles or not isinstance(self.graph, CSRGraph):
+            return self._triangle_contraction_walk(candidates)
+
+        nodes = self._candidate_nodes(candidates)
+        position = dict(zip(nodes, range(len(nodes))))
+        degree_3, groups = self._triangle_groups(candidates)
+        group_of = {}
+        for group in groups:
+            for node in group:
+                group_of[node] = group
+
+        queued = {node for node in degree_3.tolist() if node in position}
+        queue = sorted(position[node] for node in queued) # a heap
+        visited, stale = set(), set()
+        while queue:
+            i = heapq.heappop(queue)
+            node = nodes[i]
             if node in visited or self.graph.degree(node) != 3: continue
 
+            group = group_of.get(node, [node])
+            if node in stale or not stale.isdisjoint(group):
+                group = self._triangle_group_walk(node, visited)
+            else:
+                visited.update(group)
+            if len(group) == 1:
+                continue
 
-            to_reduce = []
-            stack = [node]
+            new_node = self.contract_nodes(group, 'triangle_contraction')
+            region = ball(self.graph, [new_node], 2)
+            self.operations['triangle_contraction'] += len(region)
+            stale |= region
+            for u in region: # nodes that now have degree 3, if the walk visits them after this one
+                if u not in queued and position.get(u, -1) > i and self.graph.degree(u) == 3:
+                    queued.add(u)
+                    heapq.heappush(queue, position[u])
 
-            while stack:
-                x = stack.pop()
-                if x in visited or self.graph.degree(x) != 3:
-                    continue
+    def _triangle_groups(self, candidates):
+        '''
+        The degree-3 nodes, and their groups joined by edges on a triangle,
+        found at once on the graph as it is before any contraction, see
+        src/triangles.py.
+        With candidates, only the degree-3 nodes reachable from them through
+        other degree-3 nodes are considered.
+        O(n + m) for all nodes, O(k log k) for k reachable nodes
+        '''
+        if candidates is None:
+            nodes, neighbors = self._degree_rows(3)
+        else:
+            nodes, neighbors = self._reachable_rows(candidates, 3)
 
-                visited.add(x)
-                to_reduce.append(x)
-                neighbors = set(self.graph.neighbors(x))
-
-                self.operations['triangle_contraction'] += 3 
-
-                for y in neighbors:
-                    if y in visited or self.graph.degree(y) != 3:
-                        continue
-                    common_neighbors = neighbors & set(self.graph.neighbors(y))
-                    if len(common_neighbors) >= 1:
-                        visited.add(y)
-                        to_reduce.append(y)
-                        for a in common_neighbors:
-                            for z in self.graph.neighbors(y):
-                                self.operations['triangle_contraction'] += 1
-                                if z in visited or z in to_reduce:
-                                    continue
-                                if self.graph.degree(z) == 3 and a in self.graph.neighbors(z):
-                                    stack.append(z) # recurse on z
-                                
+        groups, work = triangle_groups(nodes, neighbors)
+        self.operations['triangle_contraction'] += work
+        return nodes, groups
+
+    def _triangle_contraction_walk(self, candidates=None):
+        '''
+        triangle_contraction growing one group at a time from each degree-3 node
+        O(m) for iterating through all the edges
+        '''
+        visited = set()
+        for node in self._candidate_nodes(candidates):
+            if node in visited or self.graph.degree(node) != 3: continue
 
+            to_reduce = self._triangle_group_walk(node, visited)
             if len(to_reduce) == 1:
                 continue
 
             self.contract_nodes(to_reduce, 'triangle_contraction')
 
+    def _triangle_group_walk(self, node, visited):
+        '''
+        Group of triangle_contraction grown from node, skipping and updating visited
+        '''
+        to_reduce = []
+        stack = [node]
+
+        while stack:
+            x = stack.pop()
+            if x in visited or x in self.frozen or self.graph.degree(x) != 3:
+                continue
+
+            visited.add(x)
+            to_reduce.append(x)
+            neighbors = set(self.graph.neighbors(x))
+
+            self.operations['triangle_contraction'] += 3 
+
+            for y in neighbors:
+                if y in visited or y in self.frozen or self.graph.degree(y) != 3:
+                    continue
+                common_neighbors = neighbors & set(self.graph.neighbors(y))
+                if len(common_neighbors) >= 1:
+                    visited.add(y)
+                    to_reduce.append(y)
+                    for a in common_neighbors:
+                        for z in self.graph.neighbors(y):
+                            self.operations['triangle_contraction'] += 1
+                            if z in visited or z in to_reduce:
+                                continue
+                            if z not in self.frozen and self.graph.degree(z) == 3 and a in self.graph.neighbors(z):
+                                stack.append(z) # recurse on z
+
+        return to_reduce
+
     def get_ordering(self, metis_ordering, idx_mapping):
         '''
         Returns the final elimination ordering for the graph
+        Supernodes are expanded with an explicit stack straight into the permutation
+        O(n) overall
         '''
-        final_ordering = []
-        self.ordering_visited = set()
+        permutation = np.empty(self.total_nodes, dtype=np.int64)
+        self.ordering_visited = np.zeros(self.total_nodes, dtype=bool)
 
-        for node in self.ordering:
-            final_ordering += self._get_node_reduction(node)
+        k = 0
+        stack = []
+        for top in self._top_level_nodes(metis_ordering, idx_mapping):
+            stack.append(top)
+            while stack:
+                node = stack.pop()
+                if node in self.reduction_mapping: # it was reduced
+                    stack.extend(reversed(self._node_reduction_order(node)))
+                    continue
+                permutation[k] = node
+                self.ordering_visited[node] = True
+                k += 1
 
-        for node_idx in metis_ordering:
-            final_ordering += self._get_node_reduction(idx_mapping[node_idx])
+        return self.labels[permutation[:k]].tolist()
 
-        return final_ordering
-    
-    def _get_node_reduction(self, node):
+    def _top_level_nodes(self, metis_ordering, idx_mapping):
+        yield from self.ordering
+        for node_idx in metis_ordering:
+            yield idx_mapping[node_idx]
 
-        if node in self.reduction_mapping: # it was reduced
-            ordering = []
-            
-            for child in self._node_reduction_order(node):
-                ordering += self._get_node_reduction(child)
-            return ordering
-        
-        self.ordering_visited.add(node)
-        return [node]
-    
     def _node_reduction_order(self, node):
+        '''
+        Children of a supernode in elimination order.
+        A compressed path is eliminated starting from its u side if u is already
+        eliminated, otherwise from its v side.
+        '''
         nodes = self.reduction_mapping[node]
         if node in self.path_compression_nodes:
-            return nodes if self.path_compression_nodes[node][0] is not None \
-                and self._get_node_reduction(self.path_compression_nodes[node][0])[0] in self.ordering_visited \
-                else nodes[::-1]
+            u = self.path_compression_nodes[node][0]
+            forward = u is not None and self.ordering_visited[self._first_leaf(u)]
+            return nodes if forward else nodes[::-1]
         return nodes
 
+    def _first_leaf(self, node):
+        '''
+        Some input vertex inside node; supernodes are placed contiguously,
+        so it is eliminated iff the whole node is.
+        '''
+        if node in self._first_leaves:
+            return self._first_leaves[node]
+
+        leaf = node
+        mapping = self.reduction_mapping
+        while leaf in mapping:
+            leaf = mapping.members[mapping.offsets[leaf - mapping.n]]
+        self._first_leaves[node] = leaf
+        return leaf
+
+    def vertex_weights(self):
+        '''
+        Number of input vertices each vertex id represents, or None if nothing was contracted
+        '''
+        if not self.weighted_metis or not len(self.reduction_mapping):
+            return None
+        return np.asarray(self.reduction_mapping.weights)
+
     def __repr__(self):
         return self.__class__.__name__
     
@@ -336,7 +654,7 @@ class preMETIS:
         return sum(self.reductions.values())
 
     def total_operations(self):
-        return sum(self.operations.values())
+        return sum(self.operations[func] for func in self.reductions)
 
     def _find_lowest_reduction(self, reduced_set, node):
         while True:
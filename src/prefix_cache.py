@@ -0,0 +1,133 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+
+from .csr_graph import CSRGraph, to_csr
+
+SNAPSHOT_ATTRIBUTES = ('graph', 'reduction_mapping', 'path_compression_nodes', 'ordering', 'reductions', 'operations')
+SETTING_ATTRIBUTES = ('backend', 'local_fraction', 'batched_triangles', 'batched_paths', 'batched_simplicial') # pipeline settings that change what the steps do
+
+
+class PrefixCache:
+    '''
+    Snapshots of preMETIS states after each prefix of a Pipeline's steps, keyed by
+    (graph fingerprint, settings, steps with their parameters), so pipelines that
+    share leading steps resume from the longest cached prefix instead of
+    recomputing it. The settings are the SETTING_ATTRIBUTES of the pipeline.
+    Counters are part of the snapshot, so the reported reductions and operations
+    are the same as if every step had run.
+    Least recently used snapshots are evicted to stay within max_bytes.
+
+    Only prefixes registered with plan() (shared by at least two of the planned
+    pipelines) are snapshotted, so unshared steps pay no copying cost.
+    '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.shared_prefixes = set()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def plan(self, pipelines):
+        '''
+        Registers the step prefixes that more than one of the pipelines starts with
+        '''
+        seen = set()
+        for pipeline in pipelines:
+            for k in range(1, len(pipeline.steps) + 1):
+                prefix = (_settings_key(pipeline), _steps_key(pipeline.steps[:k]))
+                if prefix in seen:
+                    self.shared_prefixes.add(prefix)
+                seen.add(prefix)
+
+    def restore(self, pipeline):
+        '''
+        Loads the longest cached prefix of pipeline.steps into pipeline
+        Returns the number of restored steps and their per-step reduction counts
+        '''
+        pipeline._graph_key = _graph_key(pipeline)
+        for k in range(len(pipeline.steps), 0, -1):
+            key = _prefix_key(pipeline, k)
+            if key not in self.entries:
+                continue
+            self.entries.move_to_end(key)
+            self.hits += 1
+            state, counts, _ = self.entries[key]
+            for name, value in _copy_state(state).items():
+                setattr(pipeline, name, value)
+            pipeline.cached_steps = k
+            return k, dict(counts)
+        self.misses += 1
+        return 0, {}
+
+    def store(self, pipeline, k, counts):
+        '''
+        Snapshots pipeline after its first k steps
+        '''
+        key = _prefix_key(pipeline, k)
+        if key[1:] not in self.shared_prefixes:
+            return
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+
+        state = _copy_state({name: getattr(pipeline, name) for name in SNAPSHOT_ATTRIBUTES})
+        size = _estimate_bytes(state)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (state, dict(counts), size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, _, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+
+
+def _copy_state(state):
+    # graph.copy() shares the read-only CSR base arrays of the csr backend
+    return {
+        'graph' : state['graph'].copy(),
+        'reduction_mapping' : state['reduction_mapping'].copy(),
+        'path_compression_nodes' : dict(state['path_compression_nodes']),
+        'ordering' : list(state['ordering']),
+        'reductions' : dict(state['reductions']),
+        'operations' : dict(state['operations']),
+    }
+
+
+def _graph_key(pipeline):
+    '''
+    Fingerprint of the graph a pipeline starts from, computed before any step runs
+    '''
+    if getattr(pipeline, '_graph_key', None) is not None:
+        return pipeline._graph_key
+    ids, xadj, adjncy = to_csr(pipeline.graph)
+    digest = hashlib.blake2b(digest_size=16)
+    for array in (np.asarray(pipeline.labels)[ids], xadj, adjncy):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def _steps_key(steps):
+    return tuple((func, tuple(sorted(kwargs.items()))) for func, kwargs in steps)
+
+
+def _settings_key(pipeline):
+    return tuple(getattr(pipeline, attribute) for attribute in SETTING_ATTRIBUTES)
+
+
+def _prefix_key(pipeline, k):
+    return pipeline._graph_key, _settings_key(pipeline), _steps_key(pipeline.steps[:k])
+
+
+def _estimate_bytes(state):
+    graph = state['graph']
+    if isinstance(graph, CSRGraph):
+        graph_bytes = graph.alive.nbytes + graph.deg.nbytes + 200 * sum(len(nbrs) for nbrs in graph.extra.values())
+    else: # networkx dict-of-dicts
+        graph_bytes = 250 * graph.number_of_nodes() + 200 * graph.number_of_edges()
+
+    mapping = state['reduction_mapping']
+    mapping_bytes = sum(a.itemsize * len(a) for a in (mapping.parent, mapping.weights, mapping.root, mapping.members, mapping.offsets))
+    return graph_bytes + mapping_bytes + 40 * len(state['ordering']) + 200 * len(state['path_compression_nodes'])
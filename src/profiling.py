@@ -1,35 +1,73 @@
-import networkx as nx
-import pymetis
 import time
-from sksparse.cholmod import cholesky
 import scipy.sparse as sp
 import random
 import gc
+from contextlib import nullcontext
 
-
+try:
+    from sksparse.cholmod import cholesky, analyze
+except ImportError: # only needed for fill_in='cholmod' and factorization timings
+    cholesky = analyze = None
 
 from .preMETIS import preMETIS
-
-N = 10
-
-def profile(graph:nx.Graph, test:preMETIS):
+from .csr_graph import CSRGraph, permuted_pattern, to_csr
+from .symbolic import symbolic_cholesky, symbolic_fill_in, factorization_stats
+from .dissection import reduce_then_dissect
+from .partitioned import reduce_partitioned
+from .orderers import ORDERERS, INDEX_DTYPE
+from .timing import repeat, summarize
+
+def profile(graph, test:preMETIS, fill_in='symbolic', metis_lock=None, timing=None, checkpoint=None):
+    '''
+    timing is an AdaptiveTiming to repeat the ordering until its runtime is
+    known precisely enough, instead of a fixed N times
+    checkpoint(stage, fields) is called with partial results as stages finish
+    '''
+    checkpoint = checkpoint or (lambda stage, fields: None)
     print("***********************************************************")
     
     print(f"Running {test.__name__} test:")
-    print("Transforming the graph...")
-    test_graph = test(graph)
-    print(f"\tTransformation done. {test_graph.total_reductions()} total reductions made.")
-    
-    print("Running METIS...")
-    avg_runtime, ordering, idx_mapping, runtimes= _run_METIS(test_graph.graph)
-    print(f'\tMETIS done. Process took {avg_runtime} seconds to run.')
-    
-    print("Estimating fill-in...")
-    print("\tGenerating true ordering ...")
-    ordering = test_graph.get_ordering(ordering, idx_mapping)
-    print("\tPerforming factorization ...")
-    fill_in = _estimate_fill_in_cholesky(graph, ordering)
+    dissection_runtime = conversion_time = None
+    if test.dissection_threshold is not None:
+        print("Reducing and dissecting recursively...")
+        with metis_lock or nullcontext():
+            test_graph, ordering, avg_runtime, dissection_runtime = _run_dissection(graph, test)
+        runtimes = [avg_runtime]
+        print(f"\tDissection done. {test_graph.total_reductions()} total reductions made, METIS took {avg_runtime} seconds.")
+        checkpoint('reduced', _reduction_fields(test_graph))
+        checkpoint('ordered', {"METIS Runtime" : avg_runtime, "Dissection Runtime" : dissection_runtime})
+        print("Estimating fill-in...")
+    else:
+        print("Transforming the graph...")
+        if test.partitions is not None:
+            test_graph = reduce_partitioned(graph, test, test.partitions, test.partition_jobs)
+        else:
+            test_graph = test(graph)
+        print(f"\tTransformation done. {test_graph.total_reductions()} total reductions made.")
+        checkpoint('reduced', _reduction_fields(test_graph))
+
+        print(f"Running {test.orderer}...")
+        if test_graph.graph.number_of_nodes() == 0: # reduced away entirely, the orderers cannot take an empty graph
+            avg_runtime, ordering, idx_mapping, runtimes, conversion_time = 0.0, [], [], [0.0], 0.0
+        else:
+            with metis_lock or nullcontext(): # keeps timings clean when tests run in parallel
+                avg_runtime, ordering, idx_mapping, runtimes, conversion_time = _run_orderer(
+                    test_graph.graph, test_graph.vertex_weights(), test.orderer, timing)
+        print(f'\t{test.orderer} done. Process took {avg_runtime} seconds to run, after {conversion_time} seconds of conversion.')
+        checkpoint('ordered', {"METIS Runtime" : avg_runtime, "METIS runtimes" : runtimes, "Conversion Time" : conversion_time})
+
+        print("Estimating fill-in...")
+        print("\tGenerating true ordering ...")
+        ordering = test_graph.get_ordering(ordering, idx_mapping)
+    print("\tCounting symbolic factorization ...")
+    cost = _factorization_cost(graph, ordering)
+    if fill_in == 'symbolic':
+        fill_in = cost["Factor NNZ"] - (graph.number_of_nodes() + 2 * graph.number_of_edges())
+    else:
+        print("\tPerforming factorization ...")
+        fill_in = _estimate_fill_in(graph, ordering, fill_in)
     print(f'\tFill-in done. {fill_in} fill-ins required.')
+    print(f'\tFactorization needs {cost["Factorization Flops"]} flops, etree height {cost["Etree Height"]}.')
 
     print(f"All testing for {test_graph} done.")
     print("***********************************************************")
@@ -37,13 +75,14 @@ def profile(graph:nx.Graph, test:preMETIS):
     output = {
         "METIS Runtime" : avg_runtime,
         "METIS runtimes" : runtimes,
+        "METIS Runtime Stats" : summarize(runtimes, timing.confidence if timing else 0.95),
         "Nonzero Fill-in" : fill_in,
-        "Reductions" : test_graph.reductions,
-        "Total Reductions" : test_graph.total_reductions(),
-        "Original Nodes": test_graph.total_nodes,
-        "Original NNZ" : test_graph.total_edges,
-        "Operations" : test_graph.operations,
-        "Total Operations" : test_graph.total_operations(),
+        **cost,
+        **_reduction_fields(test_graph),
+        "Weighted METIS" : test_graph.weighted_metis,
+        "Orderer" : test.orderer,
+        "Conversion Time" : conversion_time,
+        "Dissection Runtime" : dissection_runtime,
     }
 
     del test_graph
@@ -53,61 +92,154 @@ def profile(graph:nx.Graph, test:preMETIS):
     return output
 
 
-def _test_fillin_random_permutation(graph: nx.Graph):
-    print("Testing Default fill-in ...")
-    fill_ins = []
+def _reduction_fields(test_graph):
+    return {
+        "Reductions" : test_graph.reductions,
+        "Total Reductions" : test_graph.total_reductions(),
+        "Original Nodes": test_graph.total_nodes,
+        "Original NNZ" : test_graph.total_edges,
+        "Operations" : test_graph.operations,
+        "Stages" : test_graph.stages.stages if test_graph.stages is not None else None,
+        "Total Operations" : test_graph.total_operations(),
+        "Rounds" : test_graph.rounds,
+        "Cached Steps" : getattr(test_graph, 'cached_steps', 0),
+    }
 
-    nodes = list(graph.nodes())
 
-    for n in range(N):
+def _test_fillin_random_permutation(graph, fill_in='symbolic', timing=None):
+    print("Testing Default fill-in ...")
+    nodes = graph.labels.tolist() if isinstance(graph, CSRGraph) else list(graph.nodes())
+
+    def sample(n):
         random.seed(n)
         permuted_nodes = nodes[:] 
         random.shuffle(permuted_nodes)
-        fill_ins.append(_estimate_fill_in_cholesky(graph, permuted_nodes))
+        return _estimate_fill_in(graph, permuted_nodes, fill_in)
 
-    avg_fill_in = sum(fill_ins) / N
+    fill_ins = repeat(sample, timing, warmup=False)
+    avg_fill_in = sum(fill_ins) / len(fill_ins)
 
     print(f'\tFill-in done. {avg_fill_in:.2f} fill-ins required.')
     return avg_fill_in, fill_ins
 
     
 
-def _estimate_fill_in_cholesky(graph: nx.Graph, elimination_order: list):
-    laplacian = nx.laplacian_matrix(graph, nodelist=elimination_order)    
-    laplacian += 1e-5 * sp.eye(laplacian.shape[0])  # Regularization
-    
-    # laplacian = laplacian.tocsc()
+def _estimate_fill_in(graph, elimination_order: list, method='symbolic'):
+    '''
+    method is 'symbolic', 'cholmod', or 'check' to cross-check both
+    '''
+    if method == 'cholmod':
+        return _estimate_fill_in_cholesky(graph, elimination_order)
+
+    fill_in = _estimate_fill_in_symbolic(graph, elimination_order)
+    if method == 'check':
+        numeric_fill_in = _estimate_fill_in_cholesky(graph, elimination_order)
+        if fill_in != numeric_fill_in:
+            raise RuntimeError(f"symbolic fill-in {fill_in} != CHOLMOD fill-in {numeric_fill_in}")
+    return fill_in
+
+
+def _estimate_fill_in_symbolic(graph, elimination_order: list):
+    '''
+    nnz(L) - nnz(A) from the elimination tree and column counts, no factorization
+    '''
+    pattern = permuted_pattern(graph, elimination_order)
+    return symbolic_fill_in(pattern.indptr, pattern.indices)
+
+
+def _factorization_cost(graph, elimination_order: list):
+    '''
+    Symbolic cost of factorizing in the given order, plus measured CHOLMOD
+    analyze / numeric factorize times when scikit-sparse is available
+    '''
+    pattern = permuted_pattern(graph, elimination_order)
+    parent, colcount = symbolic_cholesky(pattern.indptr, pattern.indices)
+    stats = factorization_stats(parent, colcount)
+    analyze_time, factorize_time = _time_cholmod(graph, elimination_order)
+
+    return {
+        "Factor NNZ" : int(colcount.sum()),
+        "Factorization Flops" : stats['flops'],
+        "Etree Height" : stats['etree_height'],
+        "Supernodes" : stats['supernodes'],
+        "CHOLMOD Analyze Time" : analyze_time,
+        "CHOLMOD Factorize Time" : factorize_time,
+    }
 
-    factor = cholesky(laplacian, beta=0) 
-    L = factor.L()
 
-    return L.nnz - laplacian.nnz
+def _time_cholmod(graph, elimination_order: list):
+    if analyze is None:
+        return None, None
+
+    laplacian = _laplacian(graph, elimination_order)
+    laplacian = (laplacian + 1e-5 * sp.eye(laplacian.shape[0])).tocsc() # Regularization
 
+    start = time.perf_counter()
+    factor = analyze(laplacian, ordering_method='natural')
+    analyze_time = time.perf_counter() - start
 
-def _run_METIS(graph:nx.Graph):
-    adj_list, idx_mapping = _graph_to_adj_list(graph)
+    start = time.perf_counter()
+    factor.cholesky_inplace(laplacian, beta=0)
+    factorize_time = time.perf_counter() - start
 
-    runtimes = []
-    total_runtime = 0
-    for _ in range(N):
-        start = time.time()
-        _, ordering = pymetis.nested_dissection(adj_list)
-        iteration_runtime = time.time() - start
-        runtimes.append(iteration_runtime)  # Store each iteration runtime
-        total_runtime += iteration_runtime
+    return analyze_time, factorize_time
 
-    # Compute average runtime
-    avg_runtime = total_runtime / N
 
-    return avg_runtime, ordering, idx_mapping, runtimes
+def _estimate_fill_in_cholesky(graph, elimination_order: list):
+    if cholesky is None:
+        raise ImportError("fill_in='cholmod' requires scikit-sparse")
+    laplacian = _laplacian(graph, elimination_order)
+    laplacian += 1e-5 * sp.eye(laplacian.shape[0])  # Regularization
+    
+    # laplacian = laplacian.tocsc()
+
+    factor = cholesky(laplacian, beta=0, ordering_method='natural') # keep the given order
+    L = factor.L()
 
-def _graph_to_adj_list(g: nx.Graph):
-    node_mapping, idx_mapping = {}, {}
+    return L.nnz - laplacian.nnz
 
-    for idx, node in enumerate(g.nodes()):
-        node_mapping[node] = idx
-        idx_mapping[idx] = node
 
-    adj_list = [[node_mapping[nbr] for nbr in g.neighbors(idx_mapping[idx])] for idx in range(g.number_of_nodes())]
-   
-    return adj_list, idx_mapping
+def _laplacian(graph, elimination_order: list):
+    adjacency = permuted_pattern(graph, elimination_order).astype(float)
+    return sp.diags(adjacency.sum(axis=1)) - adjacency
+
+
+def _run_dissection(graph, test):
+    '''
+    Orders graph with the recursive reduce-then-dissect engine. The returned
+    root reducer reports the reductions and operations of the whole tree.
+    '''
+    start = time.perf_counter()
+    root = reduce_then_dissect(graph, test, test.dissection_threshold, test.dissection_jobs)
+    runtime = time.perf_counter() - start
+
+    root.reducer.reductions = root.reductions
+    root.reducer.operations = root.operations
+    return root.reducer, root.ordering, root.metis_time, runtime
+
+
+def _run_orderer(graph, weights, name, timing=None):
+    '''
+    Orders the reduced graph with one of the ORDERERS, N times or as set by timing.
+    The graph is exported once to CSR arrays in the index type METIS uses
+    natively, so no repetition converts or copies it again; the export is
+    timed separately from the orderer.
+    weights maps vertex ids to METIS vertex weights, so separators are balanced
+    by the number of input vertices behind each supernode.
+    '''
+    orderer = ORDERERS[name]
+
+    start = time.perf_counter()
+    ids, xadj, adjncy = to_csr(graph, INDEX_DTYPE)
+    vweights = weights[ids].astype(INDEX_DTYPE) if weights is not None else None
+    conversion_time = time.perf_counter() - start
+
+    ordering = None
+    def sample(_):
+        nonlocal ordering
+        start = time.perf_counter()
+        ordering = orderer(xadj, adjncy, vweights)
+        return time.perf_counter() - start
+
+    runtimes = repeat(sample, timing)
+    return sum(runtimes) / len(runtimes), ordering, ids, runtimes, conversion_time
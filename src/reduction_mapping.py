@@ -0,0 +1,139 @@
+from array import array
+
+import numpy as np
+
+
+class ReductionMapping:
+    '''
+    Reduction hierarchy of the contracted vertices.
+
+    Vertices 0..n-1 are the input vertices; the k-th contraction creates the
+    supernode n + k. `parent[v]` is the supernode v was contracted into (-1 if
+    none) and `weights[v]` is the number of input vertices v represents.
+    The children of supernode s are stored contiguously in `members`,
+    from offsets[s - n] to offsets[s - n + 1], in contraction order.
+    `root` is a union-find forest over the same ids, used by `find`.
+    '''
+
+    def __init__(self, n):
+        self.n = n
+        self.parent = array('q', [-1]) * n
+        self.weights = array('q', [1]) * n
+        self.root = array('q', range(n))
+        self.members = array('q')
+        self.offsets = array('q', [0])
+
+    def copy(self):
+        mapping = ReductionMapping.__new__(ReductionMapping)
+        mapping.n = self.n
+        for name in ('parent', 'weights', 'root', 'members', 'offsets'):
+            setattr(mapping, name, array('q', getattr(self, name)))
+        return mapping
+
+    def add(self, nodes):
+        '''
+        Records the contraction of nodes into a new supernode and returns its id
+        O(k) where k is the number of nodes
+        '''
+        new_node = len(self.parent)
+        self.members.extend(nodes)
+        self.offsets.append(len(self.members))
+
+        self.parent.append(-1)
+        self.root.append(new_node)
+        self.weights.append(sum(self.weights[node] for node in nodes))
+        for node in nodes:
+            self.parent[node] = new_node
+            self.root[node] = new_node
+        return new_node
+
+    def add_groups(self, nodes, sizes):
+        '''
+        add() of many disjoint groups at once: nodes lists the members of every
+        group one after the other, sizes the number of members of each.
+        Returns the new supernode ids
+        O(total size), vectorized
+        '''
+        nodes = np.asarray(nodes, dtype=np.int64)
+        sizes = np.asarray(sizes, dtype=np.int64)
+        first = len(self.parent)
+        new_nodes = np.arange(first, first + len(sizes), dtype=np.int64)
+        weights = np.add.reduceat(np.frombuffer(self.weights, dtype=np.int64)[nodes], np.cumsum(sizes) - sizes) if len(nodes) else sizes
+
+        self.offsets.frombytes((len(self.members) + np.cumsum(sizes)).tobytes())
+        self.members.frombytes(nodes.tobytes())
+        self.parent.frombytes(np.full(len(sizes), -1, dtype=np.int64).tobytes())
+        self.root.frombytes(new_nodes.tobytes())
+        self.weights.frombytes(weights.astype(np.int64).tobytes())
+
+        owner = np.repeat(new_nodes, sizes)
+        for name in ('parent', 'root'): # writes through a view, released before the next resize
+            view = np.frombuffer(getattr(self, name), dtype=np.int64)
+            view[nodes] = owner
+            del view
+        return new_nodes
+
+    def merge(self, other, ids):
+        '''
+        Appends the supernodes of other, a mapping of a subgraph whose input
+        vertex i is vertex ids[i] here, with their hierarchy. The input vertices
+        must not be contracted yet.
+        Returns the ids here of all of other's vertex ids
+        O(size of other), vectorized
+        '''
+        first = len(self.parent)
+        index = np.concatenate([np.asarray(ids, dtype=np.int64), np.arange(first, first + len(other), dtype=np.int64)])
+        parent = np.array(other.parent)
+        parent = np.where(parent >= 0, index[parent], -1)
+        root = index[np.array(other.root)]
+
+        self.offsets.frombytes((len(self.members) + np.array(other.offsets)[1:]).tobytes())
+        self.members.frombytes(index[np.array(other.members)].tobytes())
+        self.parent.frombytes(parent[other.n:].tobytes())
+        self.root.frombytes(root[other.n:].tobytes())
+        self.weights.frombytes(np.array(other.weights)[other.n:].tobytes())
+
+        for name, values in (('parent', parent), ('root', root)): # writes through a view, released before the next resize
+            view = np.frombuffer(getattr(self, name), dtype=np.int64)
+            view[index[:other.n]] = values[:other.n]
+            del view
+        return index
+
+    def find(self, node):
+        '''
+        Returns the outermost supernode containing node
+        Amortized O(α(n)) with path halving
+        '''
+        root = self.root
+        while root[node] != node:
+            root[node] = root[root[node]]
+            node = root[node]
+        return node
+
+    def roots(self):
+        '''
+        find() of every id at once, by pointer jumping
+        O(n log h) where h is the height of the hierarchy
+        '''
+        root = np.array(self.root)
+        while True:
+            jumped = root[root]
+            if np.array_equal(jumped, root):
+                return root
+            root = jumped
+
+    def weight(self, node):
+        return self.weights[node]
+
+    def __contains__(self, node):
+        return self.n <= node < len(self.parent)
+
+    def __getitem__(self, node):
+        k = node - self.n
+        return self.members[self.offsets[k]:self.offsets[k + 1]].tolist()
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return iter(range(self.n, len(self.parent)))
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import time
+
+RESULTS_FILE = 'results.jsonl'
+CONFIG_ATTRIBUTES = (
+    'backend',
+    'orderer',
+    'weighted_metis',
+    'fixpoint',
+    'operation_budget',
+    'dissection_threshold',
+    'partitions',
+    'instrument_stages',
+    'local_fraction',
+    'batched_triangles',
+    'batched_paths',
+    'batched_simplicial',
+    'steps',
+)
+
+
+class ResultsStore:
+    '''
+    Append-only JSON Lines store of test results, one record per line.
+
+    Every record carries its key (graph, test, config) and a stage: profile()
+    checkpoints 'reduced' and 'ordered' records as it goes, and the full result
+    is appended as a 'done' record once the test finishes, so a crash only loses
+    the test in progress. Each record is written by a single append, so worker
+    processes can share the file.
+    '''
+
+    def __init__(self, path='results'):
+        self.path = os.path.join(path, RESULTS_FILE)
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, 'rb+') as f: # end a line cut short by a crash
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+    def append(self, key, stage, fields):
+        record = {**key, 'stage' : stage, 'time' : time.time(), **fields}
+        line = (json.dumps(record) + '\n').encode()
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def read(self, stage=None, offset=0):
+        '''
+        Records of the given stage (all if None) from byte offset on, and the
+        offset just past the last complete line
+        O(size of the file after offset)
+        '''
+        if not os.path.exists(self.path):
+            return [], offset
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+
+        marker = f'"stage": "{stage}"'.encode() if stage else b''
+        records = []
+        for line in data[:end].splitlines():
+            if marker not in line: # skips parsing the other stages
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError: # cut short by a crash
+                continue
+        return records, offset + end
+
+    def completed(self):
+        '''
+        Keys (graph, test, config) of every finished test
+        '''
+        records, _ = self.read('done')
+        return {(record['graph'], record['test'], record['config']) for record in records}
+
+
+def result_key(graph_name, test, fill_in='symbolic', timing=None):
+    '''
+    Identifies a result by graph, test name and a hash of everything else that
+    changes it: the test's configuration, the fill-in method and the timing rule
+    '''
+    config = {attribute : getattr(test, attribute, None) for attribute in CONFIG_ATTRIBUTES}
+    config['fill_in'] = fill_in
+    config['timing'] = vars(timing) if timing is not None else None
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True, default=repr).encode()).hexdigest()
+    return {'graph' : graph_name, 'test' : test.__name__, 'config' : digest[:12]}
@@ -0,0 +1,44 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+from .csr_graph import CSRGraph
+
+GRAPH_ARRAYS = ('indptr', 'indices', 'labels')
+
+
+def publish_graph(graph: CSRGraph):
+    '''
+    Copies the base arrays of a CSRGraph into shared memory blocks.
+    Returns a small picklable handle for attach_graph and the blocks,
+    which the caller must close and unlink once all workers are done.
+    '''
+    handle, blocks = {}, []
+    for name in GRAPH_ARRAYS:
+        array = np.asarray(getattr(graph, name))
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        handle[name] = (block.name, array.shape, array.dtype.str)
+        blocks.append(block)
+    return handle, blocks
+
+
+def attach_graph(handle):
+    '''
+    Read-only CSRGraph over the shared blocks of a published graph.
+    Returns the graph and the blocks, which must stay referenced while it is used.
+    '''
+    arrays, blocks = {}, []
+    for name in GRAPH_ARRAYS:
+        block_name, shape, dtype = handle[name]
+        block = shared_memory.SharedMemory(name=block_name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        arrays[name] = array
+        blocks.append(block)
+    return CSRGraph(arrays['indptr'], arrays['indices'], arrays['labels']), blocks
+
+
+def release(blocks):
+    for block in blocks:
+        block.close()
+        block.unlink()
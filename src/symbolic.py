@@ -0,0 +1,162 @@
+import numpy as np
+import scipy.sparse as sp
+
+
+def symbolic_cholesky(indptr, indices, perm=None):
+    '''
+    Elimination tree and column counts of the Cholesky factor L of P A P^T,
+    computed from the sparsity pattern of the symmetric matrix A alone.
+    colcount[j] counts the nonzeros of column j of L, diagonal included,
+    so nnz(L) = colcount.sum().
+    O(m α(m, n)) (Liu's etree and the Gilbert-Ng-Peyton column counts)
+    '''
+    Ap, Ai = _pattern(indptr, indices, perm)
+    n = len(Ap) - 1
+
+    parent = _etree(Ap, Ai, n)
+    post = _postorder(parent, n)
+    colcount = _column_counts(Ap, Ai, n, parent, post)
+    return np.array(parent), np.array(colcount)
+
+
+def elimination_tree(indptr, indices, perm=None):
+    '''
+    Parent array of the elimination tree of P A P^T (-1 for roots)
+    O(m α(m, n))
+    '''
+    Ap, Ai = _pattern(indptr, indices, perm)
+    return np.array(_etree(Ap, Ai, len(Ap) - 1), dtype=np.int64)
+
+
+def symbolic_fill_in(indptr, indices, perm=None):
+    '''
+    Fill-in measured as in _estimate_fill_in_cholesky: nnz(L) - nnz(A + I)
+    '''
+    _, colcount = symbolic_cholesky(indptr, indices, perm)
+    n = len(indptr) - 1
+    return int(colcount.sum()) - (n + len(indices))
+
+
+def factorization_stats(parent, colcount):
+    '''
+    Cost of the numeric factorization implied by an elimination tree:
+    flop estimate sum(colcount^2), etree height (critical path of a parallel
+    factorization) and number of fundamental supernodes
+    O(n)
+    '''
+    n = len(parent)
+    parent = np.asarray(parent)
+    colcount = np.asarray(colcount, dtype=np.int64)
+
+    depth = [1] * n
+    parents = parent.tolist()
+    for j in range(n - 1, -1, -1): # parent[j] > j
+        if parents[j] != -1:
+            depth[j] = depth[parents[j]] + 1
+
+    children = np.bincount(parent[parent != -1], minlength=n)
+    # j + 1 continues j's supernode if it is j's only parent/child and L's columns nest
+    continues = (parent[:-1] == np.arange(1, n)) & (children[1:] == 1) & (colcount[:-1] == colcount[1:] + 1)
+
+    return {
+        'flops' : int((colcount ** 2).sum()),
+        'etree_height' : max(depth, default=0),
+        'supernodes' : int(n - continues.sum()),
+    }
+
+
+def _pattern(indptr, indices, perm):
+    if perm is not None:
+        n = len(indptr) - 1
+        A = sp.csr_array((np.ones(len(indices), dtype=np.int8), indices, indptr), shape=(n, n))
+        A = A[perm][:, perm]
+        A.sort_indices()
+        indptr, indices = A.indptr, A.indices
+    return np.asarray(indptr).tolist(), np.asarray(indices).tolist()
+
+
+def _etree(Ap, Ai, n):
+    parent = [-1] * n
+    ancestor = [-1] * n
+    for k in range(n):
+        for p in range(Ap[k], Ap[k + 1]):
+            i = Ai[p]
+            while i != -1 and i < k: # walk up from i with path compression
+                inext = ancestor[i]
+                ancestor[i] = k
+                if inext == -1:
+                    parent[i] = k
+                i = inext
+    return parent
+
+
+def _postorder(parent, n):
+    head = [-1] * n
+    next_child = [-1] * n
+    for j in range(n - 1, -1, -1): # children in increasing order
+        if parent[j] != -1:
+            next_child[j] = head[parent[j]]
+            head[parent[j]] = j
+
+    post = []
+    for j in range(n):
+        if parent[j] != -1:
+            continue
+        stack = [j]
+        while stack:
+            p = stack[-1]
+            i = head[p]
+            if i == -1:
+                stack.pop()
+                post.append(p)
+            else:
+                head[p] = next_child[i]
+                stack.append(i)
+    return post
+
+
+def _column_counts(Ap, Ai, n, parent, post):
+    first = [-1] * n
+    maxfirst = [-1] * n
+    prevleaf = [-1] * n
+    ancestor = list(range(n))
+    delta = [0] * n
+
+    for k in range(n):
+        j = post[k]
+        delta[j] = 1 if first[j] == -1 else 0 # j is a leaf of the etree
+        while j != -1 and first[j] == -1:
+            first[j] = k
+            j = parent[j]
+
+    for k in range(n):
+        j = post[k]
+        if parent[j] != -1:
+            delta[parent[j]] -= 1
+        for p in range(Ap[j], Ap[j + 1]):
+            i = Ai[p]
+            # is j a leaf of the i-th row subtree?
+            if i <= j or first[j] <= maxfirst[i]:
+                continue
+            maxfirst[i] = first[j]
+            jprev = prevleaf[i]
+            prevleaf[i] = j
+            delta[j] += 1
+            if jprev == -1:
+                continue
+            q = jprev # least common ancestor of jprev and j
+            while q != ancestor[q]:
+                q = ancestor[q]
+            s = jprev
+            while s != q:
+                sparent = ancestor[s]
+                ancestor[s] = q
+                s = sparent
+            delta[q] -= 1
+        if parent[j] != -1:
+            ancestor[j] = parent[j]
+
+    for j in range(n): # parent[j] > j, so children are summed before their parent
+        if parent[j] != -1:
+            delta[parent[j]] += delta[j]
+    return delta
@@ -1,56 +1,154 @@
 import networkx as nx
+import numpy as np
 import os
-import json
 import gzip
 import shutil
 import urllib.request
 import gc 
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
 
 from .profiling import profile
+from .csr_graph import CSRGraph
+from .shared import publish_graph, attach_graph, release
+from .pipeline import variant_recipe, rebuild_variant
+from .results_store import ResultsStore, result_key
 
 SNAP_URL = 'https://snap.stanford.edu/data/'
 OUTPUT_DIR = 'results'
 DATA_DIR = 'data'
+CACHE_PARTS = ('indptr', 'indices', 'labels')
 
-def run(workload, tests):
+def run(workload, tests, fill_in='symbolic', jobs=1, serialize_metis=False, pin=False, timing=None, resume=False):
+    '''
+    Profiles every test on every graph, appending results to the ResultsStore in
+    OUTPUT_DIR. With resume = True, tests already completed with the same
+    configuration are skipped.
+    '''
+    store = ResultsStore(OUTPUT_DIR)
+    completed = store.completed() if resume else set()
+    pending = {}
+    for name in workload:
+        keys = [(test, result_key(name, test, fill_in, timing)) for test in tests]
+        pending[name] = [(test, key) for test, key in keys if (name, key['test'], key['config']) not in completed]
+        if len(pending[name]) < len(tests):
+            print(f"Resuming: {len(tests) - len(pending[name])} tests for {name} already done")
+
+    if jobs > 1:
+        _run_parallel(workload, pending, store, fill_in, jobs, serialize_metis, pin, timing)
+        return
 
     for name, filename in workload.items():
+        if not pending[name]:
+            continue
         print("================================================")
         print("================================================")
         print(f"Processing: {name}")
+        graph = load_network(filename)
+
+        for test, key in pending[name]:
+            results = profile(graph, test, fill_in, timing=timing, checkpoint=partial(store.append, key))
+            store.append(key, 'done', results)
+        print(f"All tests for {name} run")
+
+        del graph
+        gc.collect()
+
+
+def _run_parallel(workload, pending, store, fill_in, jobs, serialize_metis, pin, timing):
+    '''
+    Dispatches every (graph, test) pair to a process pool. Each graph is published
+    once in shared memory and workers only receive its handle.
+    '''
+    context = mp.get_context()
+    metis_lock = context.Lock() if serialize_metis else None
+    worker_ids = context.Value('i', 0)
+
+    published = {}
+    try:
+        for name, filename in workload.items():
+            if not pending[name]:
+                continue
+            print(f"Publishing: {name}")
+            published[name] = publish_graph(load_network(filename))
+
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context, initializer=_init_worker,
+                                 initargs=(metis_lock, worker_ids if pin else None)) as pool:
+            futures = {
+                pool.submit(_profile_shared, handle, variant_recipe(test), fill_in, timing, partial(store.append, key)): key
+                for name, (handle, _) in published.items()
+                for test, key in pending[name]
+            }
+            for future in as_completed(futures):
+                key = futures[future]
+                store.append(key, 'done', future.result())
+                print(f"Finished: {key['graph']} {key['test']}")
+    finally:
+        for _, blocks in published.values():
+            release(blocks)
+
+
+_worker = {'metis_lock' : None, 'graphs' : {}}
+
+def _init_worker(metis_lock, worker_ids):
+    _worker['metis_lock'] = metis_lock
+    if worker_ids is not None: # pin to one core per worker
+        with worker_ids.get_lock():
+            index = worker_ids.value
+            worker_ids.value += 1
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[index % len(cores)]})
+
+def _profile_shared(handle, recipe, fill_in, timing, checkpoint):
+    key = handle['indptr'][0]
+    if key not in _worker['graphs']: # attach once per worker, blocks kept alive
+        _worker['graphs'][key] = attach_graph(handle)
+    graph, _ = _worker['graphs'][key]
+    return profile(graph, rebuild_variant(recipe), fill_in, _worker['metis_lock'], timing, checkpoint)
+
+
+def load_network(filename, as_networkx=False):
+    '''
+    Loads the largest connected component of a SNAP dataset, downloading it if needed.
+    The component is cached as CSR .npy arrays under DATA_DIR and memory-mapped on
+    later loads, so concurrent runs share the same pages.
+    '''
+    cache_prefix = os.path.join(DATA_DIR, os.path.splitext(filename)[0])
+    if not all(os.path.exists(f"{cache_prefix}.{part}.npy") for part in CACHE_PARTS):
         file_path = os.path.join(DATA_DIR, filename)
         if not os.path.exists(file_path):
             _download_and_extract(SNAP_URL + filename + '.gz', file_path)
-        graph = _load_graph(file_path)
+        _build_cache(file_path, cache_prefix)
 
-        if not nx.is_connected(graph):
-            largest_cc = max(nx.connected_components(graph), key=len)
-            graph = graph.subgraph(largest_cc).copy()
+    graph = CSRGraph(*(np.load(f"{cache_prefix}.{part}.npy", mmap_mode='r') for part in CACHE_PARTS))
+    if as_networkx:
+        return nx.relabel_nodes(graph.to_networkx(), dict(enumerate(graph.labels.tolist())))
+    return graph
 
-        for test in tests:
-            results = profile(graph, test)
-            _save_results(results, name, test.__name__)
-        print(f"All tests for {name} run")
+def _build_cache(file_path, cache_prefix):
+    print(f"Building CSR cache for {file_path}...")
+    edges = _parse_edge_list(file_path)
+    labels, edges = np.unique(edges, return_inverse=True)
+    u, v = edges.reshape(-1, 2).T
+    graph = CSRGraph.from_edges(u, v, len(labels), labels).largest_component()
 
-        del graph
-        gc.collect()
-        
-
-def _save_results(results, graph_name, test_name):
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    out_path = os.path.join(OUTPUT_DIR, f"{graph_name}_{test_name}_results.json")
-    with open(out_path, "w") as f:
-        json.dump(results, f, indent=4)
-
-def _load_graph(file_path):
-    G = nx.Graph()
-    with open(file_path, 'r') as f:
-        for line in f:
-            if line.startswith('#'):
-                continue  # Skip comments
-            u, v = map(int, line.strip().split())
-            G.add_edge(u, v)
-    return G
+    arrays = {part : getattr(graph, part) for part in CACHE_PARTS}
+    for part in CACHE_PARTS:
+        tmp_path = f"{cache_prefix}.{part}.tmp.npy"
+        np.save(tmp_path, arrays[part])
+        os.replace(tmp_path, f"{cache_prefix}.{part}.npy") # atomic for concurrent readers
+
+def _parse_edge_list(file_path):
+    '''
+    Bulk-parses a SNAP edge list (leading '#' comment lines) into an (m, 2) array
+    '''
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    start = 0
+    while data.startswith(b'#', start): # skip comments
+        start = data.index(b'\n', start) + 1
+    return np.fromstring(data[start:], dtype=np.int64, sep=' ').reshape(-1, 2)
 
 def _download_and_extract(url, dest_path):
     os.makedirs(os.path.dirname(dest_path), exist_ok=True)
@@ -0,0 +1,67 @@
+import numpy as np
+from scipy import stats
+
+N = 10
+
+
+class AdaptiveTiming:
+    '''
+    Stopping rule for repeated measurements. After `warmup` discarded runs, a
+    measurement is repeated at least min_reps and at most max_reps times, and
+    stops as soon as the confidence interval of the mean is within
+    ±rel_width times the mean.
+    '''
+
+    def __init__(self, rel_width=0.05, min_reps=3, max_reps=50, warmup=1, confidence=0.95):
+        self.rel_width = rel_width
+        self.min_reps = min_reps
+        self.max_reps = max_reps
+        self.warmup = warmup
+        self.confidence = confidence
+
+    def done(self, samples):
+        if len(samples) < self.min_reps:
+            return False
+        if len(samples) >= self.max_reps:
+            return True
+        summary = summarize(samples, self.confidence)
+        return summary['ci_high'] - summary['mean'] <= self.rel_width * abs(summary['mean'])
+
+
+def repeat(sample, timing=None, warmup=True):
+    '''
+    Calls sample(i) for i = 0, 1, ... and returns the list of values it returned:
+    exactly N times without timing, otherwise until timing is done.
+    warmup = False skips the warmup runs, e.g. when samples are not timings.
+    '''
+    if timing is None:
+        return [sample(i) for i in range(N)]
+
+    if warmup:
+        for _ in range(timing.warmup):
+            sample(0)
+    samples = []
+    while not timing.done(samples):
+        samples.append(sample(len(samples)))
+    return samples
+
+
+def summarize(samples, confidence=0.95):
+    '''
+    Mean, median, sample standard deviation and Student-t confidence interval of the mean
+    '''
+    samples = np.asarray(samples, dtype=float)
+    mean = float(samples.mean())
+    stdev = float(samples.std(ddof=1)) if len(samples) > 1 else 0.0
+    half_width = 0.0
+    if len(samples) > 1:
+        half_width = float(stats.t.ppf((1 + confidence) / 2, len(samples) - 1) * stdev / np.sqrt(len(samples)))
+    return {
+        'mean' : mean,
+        'median' : float(np.median(samples)),
+        'stdev' : stdev,
+        'ci_low' : mean - half_width,
+        'ci_high' : mean + half_width,
+        'confidence' : confidence,
+        'repetitions' : len(samples),
+    }
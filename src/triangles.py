@@ -0,0 +1,90 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+
+def triangle_groups(nodes, neighbors):
+    '''
+    Groups of the given nodes joined by edges that lie on a triangle.
+
+    neighbors[i] lists the neighbors of nodes[i]. With A_D the adjacency rows of
+    the nodes, the edges between two of them with a common neighbor are the
+    nonzeros of A_DD ∘ (A_D A_D^T), and the groups are the connected components,
+    of more than one node, of those edges.
+
+    Returns the groups (lists of node ids) and the number of nonzeros touched.
+    O(k log k + nnz(A_D A_D^T)) for k nodes
+    '''
+    if len(nodes) < 2:
+        return [], 0
+    k, width = neighbors.shape
+    ids, cols = np.unique(np.concatenate([nodes, neighbors.ravel()]), return_inverse=True)
+    region, cols = cols[:k], cols[k:]
+    rows = sp.csr_array(
+        (np.ones(k * width, dtype=np.int32), cols, np.arange(0, k * width + 1, width)),
+        shape=(k, len(ids))
+    )
+
+    common = rows @ rows.T # common neighbors of every pair of nodes
+    sharing = rows[:, region].multiply(common) # only adjacent pairs
+
+    _, labels = connected_components(sharing, directed=False)
+    order = np.argsort(labels, kind='stable')
+    bounds = np.flatnonzero(np.diff(labels[order])).tolist()
+    members = nodes[order].tolist()
+    groups = [
+        members[start:end]
+        for start, end in zip([0] + [b + 1 for b in bounds], [b + 1 for b in bounds] + [k])
+        if end - start > 1
+    ]
+    return groups, rows.nnz + common.nnz
+
+
+def simplicial_rounds(indptr, indices, seeds, max_degree, exhaustive=True, frozen=None):
+    '''
+    Eliminates simplicial vertices of degree at most max_degree in rounds, on
+    the CSR arrays of a graph, starting from the seed vertices.
+
+    A vertex v of degree d is simplicial iff its neighborhood holds d(d-1)/2
+    edges, i.e. 2 t(v) = d(d-1) for its triangle count t(v) = diag(A^3)[v] / 2.
+    With M the rows of the tested vertices, restricted to live columns, 2 t(v)
+    is the row sum of (M A) ∘ M. Eliminating a simplicial vertex adds no edges
+    and leaves every other simplicial vertex simplicial, so each round
+    eliminates all simplicial vertices found at once, and the next round tests
+    their remaining neighbors. exhaustive=False stops after the first round.
+    Vertices set in the boolean mask frozen are never tested.
+
+    Returns the eliminated vertices in elimination order, and the number of
+    nonzeros touched.
+    O(sum over tested v of sum over neighbors u of deg(u)) per round
+    '''
+    n = len(indptr) - 1
+    A = sp.csr_array((np.ones(len(indices), dtype=np.int32), indices, indptr), shape=(n, n))
+    alive = np.ones(n, dtype=bool)
+    testable = ~frozen if frozen is not None else np.ones(n, dtype=bool)
+    degree = np.diff(indptr).astype(np.int64)
+
+    eliminated = []
+    work = 0
+    tested = np.asarray(seeds, dtype=np.int64)
+    while len(tested):
+        tested = tested[alive[tested] & testable[tested] & (degree[tested] <= max_degree)]
+        M = A[tested]
+        M.data = alive[M.indices].astype(np.int32)
+        M.eliminate_zeros()
+        paths = (M @ A).multiply(M) # paths[v, w]: live common neighbors of v and its neighbor w
+        d = degree[tested]
+        simplicial = tested[np.asarray(paths.sum(axis=1)).ravel() == d * (d - 1)]
+        work += M.nnz + paths.nnz
+        if not len(simplicial):
+            break
+
+        eliminated.append(simplicial)
+        alive[simplicial] = False
+        neighbors = A[simplicial].indices
+        degree -= np.bincount(neighbors, minlength=n)
+        if not exhaustive:
+            break
+        tested = np.unique(neighbors[alive[neighbors]])
+
+    return (np.concatenate(eliminated) if eliminated else np.empty(0, dtype=np.int64)), work
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from run import SITP12, SIDTr12, SITDTr
+from src.benchmarks import road_model, random_geometric
+from src.csr_graph import to_csr
+from src.pipeline import variant
+
+GRAPHS = [road_model(4000, 0), random_geometric(4000, 0)]
+BACKENDS = ['networkx', 'csr']
+
+
+def _summary(reduced):
+    ids, _, adjncy = to_csr(reduced.graph, np.int64)
+    return sorted(ids.tolist()), len(adjncy), reduced.total_reductions(), sorted(reduced.ordering)
+
+
+@pytest.mark.parametrize('graph', GRAPHS)
+@pytest.mark.parametrize('test', [SIDTr12, SITDTr, variant(SITDTr, fixpoint=True)])
+def test_batched_triangles(graph, test):
+    # the batched pass only runs on CSR graphs
+    walk = variant(test, backend='csr', batched_triangles=False)(graph)
+    batched = variant(test, backend='csr', batched_triangles=True)(graph)
+    assert _summary(batched) == _summary(walk)
+
+
+@pytest.mark.parametrize('graph', GRAPHS)
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_batched_paths(graph, backend):
+    walk = variant(SITP12, backend=backend, batched_paths=False)(graph)
+    batched = variant(SITP12, backend=backend, batched_paths=True)(graph)
+    assert _summary(batched) == _summary(walk)
+
+
+@pytest.mark.parametrize('graph', GRAPHS)
+@pytest.mark.parametrize('test', [SITP12, SIDTr12])
+def test_batched_simplicial(graph, test):
+    # the rounds only run on CSR graphs
+    queue = variant(test, backend='csr', batched_simplicial=False)(graph)
+    batched = variant(test, backend='csr', batched_simplicial=True)(graph)
+    assert _summary(batched) == _summary(queue)
@@ -0,0 +1,32 @@
+import networkx as nx
+import numpy as np
+
+from run import SITP12
+from src.csr_graph import to_csr
+from src.dissection import reduce_then_dissect, _top_level_parts
+from src.orderers import metis_nested_dissection, INDEX_DTYPE
+from src.pipeline import variant
+
+
+def test_grid_top_level_split():
+    # the top separator of a k x k grid is one row or column, not the nested separators below it
+    for k in (30, 60):
+        grid = nx.convert_node_labels_to_integers(nx.grid_2d_graph(k, k))
+        ids, xadj, adjncy = to_csr(grid, INDEX_DTYPE)
+        parts = _top_level_parts(xadj, adjncy, metis_nested_dissection(xadj, adjncy))
+        assert np.count_nonzero(parts == -1) <= 1.5 * k
+        sizes = np.bincount(parts[parts >= 0])
+        assert len(sizes) == 2
+        assert sizes.min() >= k * k // 3
+
+
+def test_parts_use_the_orderer():
+    # METIS only splits, the parts below the threshold are ordered by the test's orderer
+    grid = nx.convert_node_labels_to_integers(nx.grid_2d_graph(30, 30))
+    orderings = {}
+    for orderer in ('metis', 'rcm', 'mindegree'):
+        root = reduce_then_dissect(grid, variant(SITP12, orderer=orderer), threshold=200)
+        assert sorted(root.ordering) == list(range(900))
+        orderings[orderer] = root.ordering
+    assert orderings['rcm'] != orderings['metis']
+    assert orderings['mindegree'] != orderings['metis']
@@ -0,0 +1,47 @@
+import random
+
+import networkx as nx
+
+from run import SITDTr
+from src.benchmarks import road_model
+from src.incremental import IncrementalOrdering
+from src.profiling import _estimate_fill_in_symbolic
+
+
+def test_tree_reduced_to_nothing():
+    tree = nx.balanced_tree(2, 8)
+    incremental = IncrementalOrdering(tree, SITDTr(tree))
+    assert sorted(incremental.ordering()) == sorted(tree.nodes())
+
+    incremental.update(inserted=[(7, 8), (100, 200)], deleted=[(0, 1)])
+    assert sorted(incremental.ordering()) == sorted(tree.nodes())
+    assert set(incremental.parent) == set(incremental.reducer.graph.nodes())
+
+
+def test_road_updates():
+    # a reduced core is left, so updates reorder parts of the separator tree
+    graph = road_model(4000, 0).to_networkx()
+    incremental = IncrementalOrdering(graph, SITDTr(graph))
+    assert incremental.reducer.graph.number_of_nodes() > 0
+
+    rng = random.Random(0)
+    reordered = 0
+    for _ in range(5):
+        deleted = rng.sample(sorted(graph.edges()), 5)
+        inserted = []
+        for node in rng.sample(sorted(graph.nodes()), 5): # short edges, as between nearby roads
+            second = {u for v in graph.neighbors(node) for u in graph.neighbors(v)} - set(graph.neighbors(node)) - {node}
+            if second:
+                inserted.append((node, rng.choice(sorted(second))))
+        graph.remove_edges_from(deleted)
+        graph.add_edges_from(inserted)
+
+        reordered += incremental.update(inserted=inserted, deleted=deleted)['reordered']
+        ordering = incremental.ordering()
+        assert sorted(ordering) == sorted(graph.nodes())
+        assert set(incremental.parent) == set(incremental.reducer.graph.nodes())
+    assert reordered > 0
+
+    fresh = IncrementalOrdering(graph, SITDTr(graph)).ordering()
+    fill = _estimate_fill_in_symbolic(graph, ordering)
+    assert fill <= 1.1 * _estimate_fill_in_symbolic(graph, fresh)
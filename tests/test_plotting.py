@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+pytest.importorskip('pandas')
+pytest.importorskip('matplotlib')
+pytest.importorskip('seaborn')
+
+from src.plotting import load_results, compact_results, RESULTS_PARQUET
+from src.results_store import ResultsStore
+
+
+def _result(fill_in):
+    return {
+        "METIS Runtime" : 0.5,
+        "METIS runtimes" : [0.4, 0.6],
+        "Nonzero Fill-in" : fill_in,
+        "Total Reductions" : 10,
+        "Original Nodes" : 100,
+        "Original NNZ" : 500,
+        "Total Operations" : 1000,
+        "Reductions" : {"simplicial_reduction" : 10},
+        "Operations" : {"simplicial_reduction" : 1000},
+        "Stages" : {"simplicial_reduction" : {"calls" : 1}},
+    }
+
+
+def _append(store, test, fill_in, stage='done'):
+    store.append({'graph' : 'road', 'test' : test, 'config' : 'abc'}, stage, _result(fill_in))
+
+
+def test_empty_store(tmp_path):
+    store = ResultsStore(tmp_path)
+    _append(store, 'SITP12', 7, stage='reduced') # no test finished yet
+    compact_results(tmp_path)
+    assert load_results(tmp_path).empty
+
+
+def test_latest_result_per_key(tmp_path):
+    store = ResultsStore(tmp_path)
+    _append(store, 'SITP12', 7)
+    _append(store, 'SIDTr12', 8)
+    _append(store, 'SITP12', 9) # rerun
+    df = load_results(tmp_path)
+    assert sorted(zip(df['test'], df['Nonzero_Fill_in'])) == [('SIDTr12', 8), ('SITP12', 9)]
+    assert df.set_index('test').loc['SITP12', 'METIS_runtimes'] == [0.4, 0.6]
+
+
+def test_load_compacts_and_reads_columns(tmp_path):
+    store = ResultsStore(tmp_path)
+    _append(store, 'SITP12', 7)
+    df = load_results(tmp_path, columns=['Nonzero_Fill_in'])
+    assert os.path.exists(os.path.join(tmp_path, RESULTS_PARQUET)) # no manual compaction
+    assert list(df.columns) == ['graph', 'test', 'config', 'Nonzero_Fill_in']
+
+    _append(store, 'SIDTr12', 8) # appended after the compaction
+    df = load_results(tmp_path, columns=['Nonzero_Fill_in', 'Stages'])
+    assert sorted(df['Nonzero_Fill_in']) == [7, 8]
+    assert df['Stages'].tolist() == [{'simplicial_reduction' : {'calls' : 1}}] * 2
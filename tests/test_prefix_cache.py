@@ -0,0 +1,34 @@
+import networkx as nx
+import pytest
+
+from run import SITP12, SIDTr12
+from src.pipeline import variant
+from src.prefix_cache import PrefixCache
+
+GRAPH = nx.convert_node_labels_to_integers(nx.grid_2d_graph(40, 40))
+SETTINGS = [
+    {'local_fraction' : 0.5},
+    {'instrument_stages' : 'time'},
+    {'batched_triangles' : False},
+    {'batched_paths' : False},
+    {'batched_simplicial' : False},
+]
+
+
+def _run(tests):
+    cache = PrefixCache(2**30)
+    tests = [variant(test, prefix_cache=cache) for test in tests]
+    cache.plan(tests)
+    return [test(GRAPH) for test in tests]
+
+
+def test_shared_prefix_is_restored():
+    # SITP12 and SIDTr12 both start with simplicial_reduction and indistinguishable_reduction
+    _, reduced = _run([SITP12, SIDTr12])
+    assert reduced.cached_steps == 2
+
+
+@pytest.mark.parametrize('settings', SETTINGS)
+def test_settings_are_not_shared(settings):
+    _, reduced = _run([SITP12, variant(SIDTr12, **settings)])
+    assert reduced.cached_steps == 0
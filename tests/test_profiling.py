@@ -0,0 +1,15 @@
+import networkx as nx
+
+from run import SITDTr
+from src.profiling import profile
+
+
+def test_graph_reduced_to_nothing():
+    # simplicial reduction eliminates a whole tree, METIS must not see the empty graph
+    tree = nx.balanced_tree(2, 8)
+    reduced = SITDTr(tree)
+    assert reduced.graph.number_of_nodes() == 0
+
+    output = profile(tree, SITDTr)
+    assert output["Factor NNZ"] == tree.number_of_nodes() + tree.number_of_edges() # no fill
+    assert output["Total Reductions"] == tree.number_of_nodes()
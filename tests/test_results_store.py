@@ -0,0 +1,23 @@
+import pytest
+
+from run import SITP12
+from src.pipeline import variant
+from src.results_store import result_key
+
+SETTINGS = [
+    {'instrument_stages' : 'time'},
+    {'instrument_stages' : 'memory'},
+    {'local_fraction' : 0.5},
+    {'batched_triangles' : False},
+    {'batched_paths' : False},
+    {'batched_simplicial' : False},
+]
+
+
+@pytest.mark.parametrize('settings', SETTINGS)
+def test_settings_have_their_own_key(settings):
+    # variants like --instrument keep the test name, only the configuration hash tells the runs apart
+    plain = result_key('road', SITP12)
+    key = result_key('road', variant(SITP12, **settings))
+    assert key['test'] == plain['test']
+    assert key['config'] != plain['config']
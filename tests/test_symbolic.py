@@ -0,0 +1,55 @@
+import random
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from src import profiling
+from src.profiling import _estimate_fill_in_symbolic
+from src.symbolic import symbolic_fill_in
+
+GRAPHS = [nx.gnp_random_graph(n, p, seed=seed) for seed, (n, p) in enumerate([(1, 0.5), (8, 0.3), (15, 0.2), (25, 0.15), (40, 0.08)] * 4)]
+
+
+def _eliminate(graph, order):
+    '''
+    nnz(L) by eliminating the vertices one by one, joining the neighbors of
+    each into a clique
+    '''
+    graph = graph.copy()
+    nnz = graph.number_of_nodes()
+    for node in order:
+        neighbors = list(graph.neighbors(node))
+        nnz += len(neighbors)
+        graph.add_edges_from((u, v) for i, u in enumerate(neighbors) for v in neighbors[i + 1:])
+        graph.remove_node(node)
+    return nnz
+
+
+@pytest.mark.parametrize('graph', GRAPHS)
+def test_symbolic_fill_in(graph):
+    order = list(graph.nodes())
+    random.Random(graph.number_of_edges()).shuffle(order)
+    expected = _eliminate(graph, order) - (graph.number_of_nodes() + 2 * graph.number_of_edges()) # nnz(L) - nnz(A + I)
+
+    A = nx.to_scipy_sparse_array(graph, nodelist=range(graph.number_of_nodes()), weight=None, format='csr')
+    assert symbolic_fill_in(A.indptr, A.indices, np.array(order)) == expected
+    assert _estimate_fill_in_symbolic(graph, order) == expected
+
+
+@pytest.mark.parametrize('graph', GRAPHS)
+def test_cholmod_fill_in(graph):
+    pytest.importorskip('sksparse.cholmod')
+    from src.profiling import _estimate_fill_in_cholesky
+
+    order = list(graph.nodes())
+    random.Random(graph.number_of_edges()).shuffle(order)
+    assert _estimate_fill_in_cholesky(graph, order) == _estimate_fill_in_symbolic(graph, order)
+
+
+def test_check_raises_on_mismatch(monkeypatch):
+    # not an assert, which python -O strips
+    graph = GRAPHS[-1]
+    monkeypatch.setattr(profiling, '_estimate_fill_in_cholesky', lambda graph, order: -1)
+    with pytest.raises(RuntimeError):
+        profiling._estimate_fill_in(graph, list(graph), 'check')